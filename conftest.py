@@ -0,0 +1,2 @@
+# pytest adds the folder of this file to sys.path, so that the tests import the resources and solver packages without any
+# installation
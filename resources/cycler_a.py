@@ -30,7 +30,7 @@ class CyclerA:
 
 
 if __name__ == '__main__':
-    cy = Cycler()
+    cy = CyclerA()
     assert cy.current == 'NW'
     cy.turn(2)
     assert cy.current == 'E'
@@ -1,31 +1,138 @@
+import csv
+import hashlib
+import mmap
 import os
+import struct
 from typing import List
 
-import pandas as pd
-
 from resources.hexagon import TantrixHex
 
 
-def import_tantrix_data(filepath: str = None) -> pd.DataFrame:
+TANTRIX_PIECES_PATH = os.path.join(os.path.dirname(__file__), 'tantrix_pieces.csv')
+TANTRIX_CATALOGUE_PATH = os.path.join(os.path.dirname(__file__), 'tantrix_pieces.bin')
+
+# layout of the binary catalogue: header with the digest of the CSV-file, then one record per tile: back number, back
+# color, edge colors of the 6 rotations, packed edge colors of the 6 rotations, and line type of each color (0 if none)
+_CATALOGUE_MAGIC = b'TXTC'
+_CATALOGUE_VERSION = 1
+_CATALOGUE_HEADER = struct.Struct('<4sB32s')
+_CATALOGUE_TILE = struct.Struct('<Bc36s6I4B')
+_LINE_COLORS = 'rbyg'
+
+
+def import_tantrix_data(filepath: str = None) -> 'pd.DataFrame':
     """Reads the CSV-file with the description of each Tantrix tile, and returns a dataframe."""
+    import pandas as pd
+
     if filepath is None:
-        filepath = os.path.join(os.path.dirname(__file__), 'tantrix_pieces.csv')
+        filepath = TANTRIX_PIECES_PATH
     df = pd.read_csv(filepath, header=None, names=['back_number', 'back_color', 'edge_colors'])
     assert not df.edge_colors.duplicated().any()
     return df
 
 
-def populate_tantrix_hexagons() -> List[TantrixHex]:
-    """Reads the CSV-file with the description of each Tantrix tile, and returns a list of TantrixHex objects."""
-    df = import_tantrix_data()
+def read_tantrix_rows(filepath: str = None) -> List[tuple]:
+    """Reads the CSV-file with the description of each Tantrix tile, and returns its (back_number, back_color,
+    edge_colors) rows. Unlike import_tantrix_data, this doesn't need pandas."""
+    if filepath is None:
+        filepath = TANTRIX_PIECES_PATH
+    # the file starts with a byte order mark
+    with open(filepath, newline='', encoding='utf-8-sig') as f:
+        rows = [(int(back_number), back_color, edge_colors) for back_number, back_color, edge_colors in csv.reader(f)]
+    assert len({edge_colors for __, __, edge_colors in rows}) == len(rows)
+    return rows
+
+
+def populate_tantrix_hexagons(use_catalogue: bool = True) -> List[TantrixHex]:
+    """Reads the CSV-file with the description of each Tantrix tile, and returns a list of TantrixHex objects. By
+    default, the tiles are read from the binary catalogue instead, which is rebuilt if the CSV-file changed."""
+    if use_catalogue:
+        return get_tantrix_catalogue().get_tiles()
     hex_list = []
-    for __, row in df.iterrows():
-        hex_list.append(TantrixHex(edge_colors=row.edge_colors,
-                                   back_color=row.back_color,
-                                   back_number=row.back_number))
+    for back_number, back_color, edge_colors in read_tantrix_rows():
+        hex_list.append(TantrixHex(edge_colors=edge_colors,
+                                   back_color=back_color,
+                                   back_number=back_number))
     return hex_list
 
 
+def hash_tantrix_data(filepath: str = None) -> bytes:
+    """SHA-256 digest of the CSV-file, identifying the catalogue built from it."""
+    if filepath is None:
+        filepath = TANTRIX_PIECES_PATH
+    with open(filepath, 'rb') as f:
+        return hashlib.sha256(f.read()).digest()
+
+
+def build_tantrix_catalogue(csv_filepath: str = None, catalogue_filepath: str = None):
+    """Validate the tiles of the CSV-file, through the TantrixHex constructor, and write everything it computes to the
+    binary catalogue: the edge colors and packed edge colors of each rotation, and the line type of each color."""
+    if catalogue_filepath is None:
+        catalogue_filepath = TANTRIX_CATALOGUE_PATH
+    chunks = [_CATALOGUE_HEADER.pack(_CATALOGUE_MAGIC, _CATALOGUE_VERSION, hash_tantrix_data(csv_filepath))]
+    for back_number, back_color, edge_colors in read_tantrix_rows(csv_filepath):
+        tile = TantrixHex(edge_colors=edge_colors, back_color=back_color, back_number=back_number)
+        chunks.append(_CATALOGUE_TILE.pack(tile.back_number, tile.back_color.encode(),
+                                           ''.join(tile.rotated_edge_colors).encode(), *tile.rotated_codes,
+                                           *(tile.line_types.get(color, 0) for color in _LINE_COLORS)))
+    # several processes may rebuild the catalogue at the same time: each one writes its own file, and the replacement
+    # is atomic
+    tmp_filepath = f'{catalogue_filepath}.{os.getpid()}.tmp'
+    with open(tmp_filepath, 'wb') as f:
+        f.write(b''.join(chunks))
+    os.replace(tmp_filepath, catalogue_filepath)
+
+
+class TantrixCatalogue:
+    """Binary catalogue of the tiles, memory-mapped, so that loading the tiles doesn't parse or validate anything, and
+    all the processes reading it share the same pages. The catalogue is built from the CSV-file, and rebuilt
+    automatically whenever the digest of the CSV-file doesn't match the one it was built from."""
+    def __init__(self, catalogue_filepath: str = None, csv_filepath: str = None):
+        self.catalogue_filepath = TANTRIX_CATALOGUE_PATH if catalogue_filepath is None else catalogue_filepath
+        digest = hash_tantrix_data(csv_filepath)
+        if not self._is_up_to_date(digest):
+            build_tantrix_catalogue(csv_filepath, self.catalogue_filepath)
+        with open(self.catalogue_filepath, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.n_tiles = (len(self.buffer) - _CATALOGUE_HEADER.size) // _CATALOGUE_TILE.size
+
+    def _is_up_to_date(self, digest: bytes) -> bool:
+        if not os.path.exists(self.catalogue_filepath):
+            return False
+        with open(self.catalogue_filepath, 'rb') as f:
+            header = f.read(_CATALOGUE_HEADER.size)
+        if len(header) < _CATALOGUE_HEADER.size:
+            return False
+        return _CATALOGUE_HEADER.unpack(header) == (_CATALOGUE_MAGIC, _CATALOGUE_VERSION, digest)
+
+    def __len__(self) -> int:
+        return self.n_tiles
+
+    def get_tile(self, idx: int) -> TantrixHex:
+        """Returns a new TantrixHex with the content of a tile of the catalogue."""
+        fields = _CATALOGUE_TILE.unpack_from(self.buffer, _CATALOGUE_HEADER.size + idx * _CATALOGUE_TILE.size)
+        back_number, back_color, rotated_edge_colors = fields[0], fields[1].decode(), fields[2].decode()
+        line_types = {color: line_type for color, line_type in zip(_LINE_COLORS, fields[9:]) if line_type}
+        return TantrixHex.from_precomputed(back_color=back_color, back_number=back_number,
+                                           rotated_edge_colors=tuple(rotated_edge_colors[i:i + 6]
+                                                                     for i in range(0, 36, 6)),
+                                           rotated_codes=fields[3:9], line_types=line_types)
+
+    def get_tiles(self) -> List[TantrixHex]:
+        return [self.get_tile(idx) for idx in range(self.n_tiles)]
+
+
+_tantrix_catalogue = None
+
+
+def get_tantrix_catalogue() -> TantrixCatalogue:
+    """The catalogue of the tiles in the resources folder, mapped on first use."""
+    global _tantrix_catalogue
+    if _tantrix_catalogue is None:
+        _tantrix_catalogue = TantrixCatalogue()
+    return _tantrix_catalogue
+
+
 if __name__ == '__main__':
     # make sure that there are no typos in the tile file. To do that, the CSV-file was manually written twice, and we
     # make sure we have the exact sames content in both of them.
@@ -1,5 +1,16 @@
-import numpy as np
-import pandas as pd
+# codes of the edge colors, 0 being an edge without any line
+COLOR_CODES = {'-': 0, 'r': 1, 'b': 2, 'y': 3, 'g': 4}
+CODE_COLORS = '-rbyg'
+CODE_BITS = 3  # per edge
+CODE_MASK = (1 << CODE_BITS) - 1
+
+
+def pack_edge_colors(edge_colors: str) -> int:
+    """Pack the six edge colors into an integer, the color of edge i being the code stored at bits 3i to 3i + 2."""
+    codes = 0
+    for edge, color in enumerate(edge_colors):
+        codes |= COLOR_CODES[color] << (CODE_BITS * edge)
+    return codes
 
 
 class TantrixHex:
@@ -10,26 +21,58 @@ class TantrixHex:
     at the beginning of the list.
     Each tile also has a number and color, which refers to how many tiles are in the puzzle, and what color must the
     ring be. Those two attribute are barely used (if any).
+    The edge colors of the 6 rotations, as strings and packed integers (see pack_edge_colors), and the line types are
+    computed once when the tile is created, so that rotating a tile or reading its edges are only table lookups.
     """
+    __slots__ = ('back_color', 'back_number', 'original_edge_colors', 'line_types', 'rotation',
+                 'rotated_edge_colors', 'rotated_codes')
+
     def __init__(self, edge_colors: str, back_color: str, back_number: int):
         # sanity check
         assert 1 <= back_number <= 30
         assert back_color in 'rby'
         assert isinstance(edge_colors, str)
+        assert len(edge_colors) == 6
         if '-' not in edge_colors:
-            assert len(edge_colors) == 6
-            char_counts = pd.Series(iter(edge_colors)).value_counts()
-            assert len(char_counts) == 3
-            assert (char_counts == 2).all()
+            assert len(set(edge_colors)) == 3
+            assert all(edge_colors.count(c) == 2 for c in edge_colors)
 
-        self.edge_colors = edge_colors
         self.back_color = back_color
         self.back_number = back_number
         self.original_edge_colors = edge_colors
+        self.rotation = 0
+        self.rotated_edge_colors = tuple(edge_colors[(6 - cw_steps):] + edge_colors[:(6 - cw_steps)]
+                                         for cw_steps in range(6))
+        self.rotated_codes = tuple(pack_edge_colors(colors) for colors in self.rotated_edge_colors)
         self.line_types = dict()
 
         self.populate_color_lines_types()
 
+    @classmethod
+    def from_precomputed(cls, back_color: str, back_number: int, rotated_edge_colors: tuple, rotated_codes: tuple,
+                         line_types: dict) -> 'TantrixHex':
+        """Build a tile from values already computed, and validated, by the constructor, e.g. read from the binary
+        catalogue (see data_loader.py). Nothing is checked."""
+        tile = cls.__new__(cls)
+        tile.back_color = back_color
+        tile.back_number = back_number
+        tile.original_edge_colors = rotated_edge_colors[0]
+        tile.rotation = 0
+        tile.rotated_edge_colors = rotated_edge_colors
+        tile.rotated_codes = rotated_codes
+        tile.line_types = line_types
+        return tile
+
+    @property
+    def edge_colors(self) -> str:
+        """Edge colors of the tile in its current rotation."""
+        return self.rotated_edge_colors[self.rotation]
+
+    @property
+    def codes(self) -> int:
+        """Packed edge colors of the tile in its current rotation."""
+        return self.rotated_codes[self.rotation]
+
     def populate_color_lines_types(self):
         """Populate the line_types attribute, informing on the type of lines on the tile. The number gives the number of
         sides between the entry and exit of a color line:
@@ -38,8 +81,9 @@ class TantrixHex:
             3 : across, straight line"""
         line_dict = dict()
 
-        for color in np.unique(list(self.edge_colors)):
-            dist = np.diff(np.where(np.array(list(self.edge_colors)) == color))[0][0]
+        for color in sorted(set(self.original_edge_colors) - {'-'}):
+            first = self.original_edge_colors.index(color)
+            dist = self.original_edge_colors.index(color, first + 1) - first
             if dist == 3:
                 line_dict[color] = 3  # across
             elif dist in (2, 4):
@@ -53,11 +97,18 @@ class TantrixHex:
 
     def rotate(self, cw_steps: int):
         """Rotate the tile by x steps, clockwise"""
-        cw_steps = cw_steps % 6
-        self.edge_colors = self.edge_colors[(6 - cw_steps):] + self.edge_colors[:(6 - cw_steps)]
+        self.rotation = (self.rotation + cw_steps) % 6
+
+    def get_rotated_edge_colors(self, cw_steps: int) -> str:
+        """Edge colors of the tile rotated by x steps clockwise from its original orientation, leaving it untouched."""
+        return self.rotated_edge_colors[cw_steps % 6]
+
+    def get_rotated_codes(self, cw_steps: int) -> int:
+        """Packed edge colors of the tile rotated by x steps clockwise from its original orientation."""
+        return self.rotated_codes[cw_steps % 6]
 
     def reset_rotation(self):
-        self.edge_colors = self.original_edge_colors
+        self.rotation = 0
 
 
 if __name__ == '__main__':
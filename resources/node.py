@@ -2,18 +2,50 @@
 
 DavidPerruchoud (created on 27/12/2021)
 """
+from typing import List, Tuple
 
 
 class TreeNode:
-    def __init__(self, ):
-        self.leaf = None
-        self.rotation = None  # 1, 2 3
-        self.prev = None
+    """A tile of the branch explored by a ring search: its line type and the orientation it is placed with. prev is the
+    node of the previous tile, and pos or neg the node of the next one, depending on the orientation of the next one."""
+    def __init__(self, rotation: int = None, orientation: int = None, prev: 'TreeNode' = None):
+        self.rotation = rotation  # 1, 2 3
+        self.orientation = orientation
+        self.prev = prev
         self.pos = None
         self.neg = None
-        self.pos_explored
-        self.neg_explored = False
+        if prev is not None:
+            if orientation == 1:
+                prev.pos = self
+            else:
+                prev.neg = self
 
 
 class Tree:
-    pass
+    """The frontier of a depth-first ring search, as the branch of TreeNodes being explored: at each depth, the children
+    before the node were explored, and the next ones are still to be explored. It is serialised as the (line type,
+    orientation) of each node, so it can be saved and resumed."""
+    def __init__(self, branch: List[Tuple[int, int]] = ()):
+        self.root = None
+        self.last = None
+        self.depth = 0
+        for tile_type, orientation in branch:
+            self.push(tile_type, orientation)
+
+    def push(self, tile_type: int, orientation: int) -> TreeNode:
+        """Adds a node at the end of the branch."""
+        node = TreeNode(tile_type, orientation, prev=self.last)
+        if self.last is None:
+            self.root = node
+        self.last = node
+        self.depth += 1
+        return node
+
+    def get_branch(self) -> List[Tuple[int, int]]:
+        """The (line type, orientation) of each node, from the root."""
+        branch = []
+        node = self.last
+        while node is not None:
+            branch.append((node.rotation, node.orientation))
+            node = node.prev
+        return branch[::-1]
@@ -0,0 +1,154 @@
+"""Command line solver for a batch of puzzles, without any plotting. One result record is written per puzzle, as soon as
+it is solved, as JSON lines or CSV. For instance, the standard puzzles from 3 to 10 tiles, with a 60 seconds timeout:
+
+    python -m solver.batch_solver --sizes 3 4 5 6 7 8 9 10 --timeout 60 --output results.jsonl
+
+and a custom set of tiles, given by their back numbers, with a yellow ring:
+
+    python -m solver.batch_solver --tiles 1,2,3,7 --color y --format csv
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import signal
+import sys
+import time
+from typing import Iterator, List, TextIO
+
+from resources.data_loader import populate_tantrix_hexagons
+from solver.ring_solver import find_solution
+from solver.search_stats import SearchStats
+
+
+RECORD_FIELDS = ['puzzle', 'n_tiles', 'color', 'tiles', 'status', 'time', 'nodes', 'rings', 'placements', 'error']
+
+
+def iter_puzzles(pieces: list, sizes: List[int], tile_sets: List[List[int]], color: str = None) -> Iterator[dict]:
+    """Yields the puzzles to solve, as dicts with their name, tiles and color. The standard puzzle of size n uses the
+    first n tiles, and the color of the back of the n-th one. Custom sets are given by the back numbers of their tiles,
+    and use the given color, or else the back color of their last tile."""
+    tiles_by_number = {tile.back_number: tile for tile in pieces}
+    for size in sizes:
+        assert 3 <= size <= len(pieces)
+        yield dict(puzzle=f'puzzle_{size}', tiles=pieces[:size], color=color or pieces[size - 1].back_color)
+    for tile_numbers in tile_sets:
+        tiles = [tiles_by_number[number] for number in tile_numbers]
+        yield dict(puzzle='tiles_' + '-'.join(map(str, tile_numbers)), tiles=tiles,
+                   color=color or tiles[-1].back_color)
+
+
+def _solve_in_process(pieces: list, color: str, workers: int, connection):
+    """Target of the process solving a single puzzle. Sends back the status, the solution and the SearchStats."""
+    # terminating this process must also stop the pool of a parallel solve
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(1))
+    start = time.perf_counter()
+    try:
+        solution, stats = find_solution(pieces, color, parallel=workers > 1, workers=workers)
+    except Exception as e:
+        connection.send(('error', repr(e), SearchStats(), time.perf_counter() - start))
+        return
+    if solution is not None:
+        solution = [(pieces.index(tile), rotation, position) for tile, rotation, position in solution]
+    connection.send(('solved' if solution else 'no_solution', solution, stats, time.perf_counter() - start))
+
+
+def solve_puzzle(puzzle: dict, timeout: float = None, workers: int = 1) -> dict:
+    """Solve a puzzle in its own process, so that it can be stopped after timeout seconds, and returns its record."""
+    pieces = puzzle['tiles']
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_solve_in_process, args=(pieces, puzzle['color'], workers, sender))
+    start = time.perf_counter()
+    process.start()
+    sender.close()
+
+    if receiver.poll(timeout):
+        try:
+            status, solution, stats, elapsed = receiver.recv()
+        except EOFError:
+            # the process stopped without sending anything, e.g. killed when out of memory
+            process.join()
+            status, stats, elapsed = 'error', SearchStats(), time.perf_counter() - start
+            solution = f"The solving process stopped with exit code {process.exitcode}"
+    else:
+        status, solution, stats, elapsed = 'timeout', None, SearchStats(), time.perf_counter() - start
+    process.terminate()
+    process.join()
+
+    record = dict(puzzle=puzzle['puzzle'], n_tiles=len(pieces), color=puzzle['color'],
+                  tiles=[tile.back_number for tile in pieces], status=status, time=round(elapsed, 6),
+                  nodes=stats['nodes'], rings=stats['rings'], placements=None, stats=stats.as_dict())
+    if status == 'solved':
+        record['placements'] = [dict(tile=pieces[tile_idx].back_number, rotation=rotation, x=position[0],
+                                     y=position[1]) for tile_idx, rotation, position in solution]
+    elif status == 'error':
+        record['error'] = solution
+    return record
+
+
+class RecordWriter:
+    """Writes the result records, one line per puzzle, and flushes each of them so that they can be read while the
+    batch is still running."""
+    def __init__(self, stream: TextIO, output_format: str = 'json'):
+        assert output_format in ('json', 'csv')
+        self.stream = stream
+        self.output_format = output_format
+        if output_format == 'csv':
+            self.csv_writer = csv.DictWriter(stream, fieldnames=RECORD_FIELDS, extrasaction='ignore')
+            self.csv_writer.writeheader()
+
+    def write(self, record: dict):
+        if self.output_format == 'json':
+            self.stream.write(json.dumps(record) + '\n')
+        else:
+            row = dict(record, tiles=' '.join(map(str, record['tiles'])))
+            if record['placements'] is not None:
+                # tile:rotation@x,y for each placed tile
+                row['placements'] = ' '.join(f"{p['tile']}:{p['rotation']}@{p['x']},{p['y']}"
+                                             for p in record['placements'])
+            self.csv_writer.writerow(row)
+        self.stream.flush()
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Solve a batch of Tantrix puzzles, without plotting.")
+    parser.add_argument('--sizes', type=int, nargs='*', default=[],
+                        help="sizes of the standard puzzles to solve, using the first tiles of the catalogue")
+    parser.add_argument('--tiles', action='append', default=[],
+                        help="custom set of tiles, as comma separated back numbers. Can be repeated.")
+    parser.add_argument('--color', choices=list('rbyg'),
+                        help="color of the ring, by default the back color of the last tile of each puzzle")
+    parser.add_argument('--timeout', type=float, help="maximum time per puzzle, in seconds")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes per puzzle")
+    parser.add_argument('--format', choices=['json', 'csv'], default='json', help="JSON lines or CSV records")
+    parser.add_argument('--output', help="output file, by default the standard output")
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes
+    if not sizes and not args.tiles:
+        sizes = list(range(3, 11))
+    pieces = populate_tantrix_hexagons()
+    for size in sizes:
+        if not 3 <= size <= len(pieces):
+            parser.error(f"the sizes must be between 3 and {len(pieces)}, got {size}")
+    try:
+        tile_sets = [[int(number) for number in tiles.split(',')] for tiles in args.tiles]
+    except ValueError as e:
+        parser.error(f"the tiles must be comma separated back numbers: {e}")
+    back_numbers = {tile.back_number for tile in pieces}
+    for tile_numbers in tile_sets:
+        unknown = [number for number in tile_numbers if number not in back_numbers]
+        if unknown:
+            parser.error(f"unknown tiles {unknown}, the back numbers are 1 to {len(pieces)}")
+    stream = sys.stdout if args.output is None else open(args.output, 'w', newline='')
+    try:
+        writer = RecordWriter(stream, args.format)
+        for puzzle in iter_puzzles(pieces, sizes, tile_sets, args.color):
+            writer.write(solve_puzzle(puzzle, timeout=args.timeout, workers=args.workers))
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+
+if __name__ == '__main__':
+    main()
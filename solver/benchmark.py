@@ -0,0 +1,216 @@
+"""Benchmarks of the solver hot paths: tile construction and rotation, grid construction and placement, line parsing,
+ring search and full solves of the standard puzzles. The inputs are drawn with a fixed seed, and each benchmark keeps
+the best and median time per call over several repeats. Results are written as JSON, and can be compared with a
+baseline from a previous run, flagging the benchmarks that got slower by more than a threshold:
+
+    python -m solver.benchmark --save-baseline
+    python -m solver.benchmark --baseline resources/benchmark_baseline.json --threshold 0.2
+
+Nothing is plotted, and the ring library is not used, so that the ring search is always timed.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import timeit
+from typing import Callable, Dict, List
+
+from resources.data_loader import populate_tantrix_hexagons, read_tantrix_rows
+from resources.hexagon import TantrixHex
+from solver.hexagrid import POSITION_OFFSET, CompactHexaGrid, HexaCell, HexaGrid, SparseHexaGrid
+from solver.ring_library import RingLibrary
+from solver.ring_search import RingSearch
+from solver.ring_solver import find_solution
+
+
+BENCHMARK_BASELINE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'resources',
+                                       'benchmark_baseline.json')
+PUZZLE_SIZES = range(3, 11)
+
+
+def _bench_tile_construction(rng: random.Random) -> Callable:
+    rows = rng.sample(read_tantrix_rows(), 10)
+
+    def run():
+        for back_number, back_color, edge_colors in rows:
+            TantrixHex(edge_colors=edge_colors, back_color=back_color, back_number=back_number)
+    return run
+
+
+def _bench_tile_rotation(rng: random.Random) -> Callable:
+    tiles = rng.sample(populate_tantrix_hexagons(), 10)
+    rotations = [rng.randrange(6) for __ in tiles]
+
+    def run():
+        for tile, rotation in zip(tiles, rotations):
+            tile.reset_rotation()
+            tile.rotate(rotation)
+            tile.edge_colors
+    return run
+
+
+def _bench_grid_construction(grid_class: type) -> Callable:
+    def run():
+        grid_class(20)
+    return run
+
+
+def _bench_place_piece(rng: random.Random, grid_class: type) -> Callable:
+    tiles = rng.sample(populate_tantrix_hexagons(), 10)
+    grid = grid_class(20)
+    # a random walk on free cells
+    positions = [grid.mid]
+    while len(positions) < len(tiles):
+        offset = POSITION_OFFSET[rng.randrange(6)]
+        position = (positions[-1][0] + offset[0], positions[-1][1] + offset[1])
+        if position not in positions:
+            positions.append(position)
+
+    def run():
+        for tile, position in zip(tiles, positions):
+            grid.place_piece(*position, piece=tile)
+        for __ in tiles:
+            grid.remove_last_piece()
+    return run
+
+
+def _bench_populate_lines(rng: random.Random) -> Callable:
+    edge_colors = [edge_colors for __, __, edge_colors in rng.sample(read_tantrix_rows(), 10)]
+    cell = HexaCell()
+
+    def run():
+        for colors in edge_colors:
+            cell.lines = dict()
+            cell._populate_lines(colors)
+    return run
+
+
+def _get_puzzle(n_tiles: int) -> tuple:
+    """The standard puzzle with n_tiles, as in main_solver."""
+    pieces = populate_tantrix_hexagons()
+    return pieces[:n_tiles], pieces[n_tiles - 1].back_color
+
+
+def _bench_ring_search(n_tiles: int) -> Callable:
+    pieces, color = _get_puzzle(n_tiles)
+    ring_types = [p.line_types.get(color) for p in pieces]
+
+    def run():
+        for __ in RingSearch(ring_types).iter_rings():
+            pass
+    return run
+
+
+def _bench_solve(n_tiles: int) -> Callable:
+    pieces, color = _get_puzzle(n_tiles)
+    # a library without any ring, so that they are searched
+    library = RingLibrary(filepath='')
+
+    def run():
+        solution, __ = find_solution(pieces, color, library=library)
+        assert solution is not None
+    return run
+
+
+def get_benchmarks(seed: int = 0) -> Dict[str, Callable]:
+    """The benchmarks, by name, each one set up with its own random generator seeded with seed."""
+    setups = {
+        'tile_construction': lambda rng: _bench_tile_construction(rng),
+        'tile_rotation': lambda rng: _bench_tile_rotation(rng),
+        'grid_construction': lambda rng: _bench_grid_construction(HexaGrid),
+        'compact_grid_construction': lambda rng: _bench_grid_construction(CompactHexaGrid),
+        'sparse_grid_construction': lambda rng: _bench_grid_construction(SparseHexaGrid),
+        'place_piece': lambda rng: _bench_place_piece(rng, HexaGrid),
+        'compact_place_piece': lambda rng: _bench_place_piece(rng, CompactHexaGrid),
+        'sparse_place_piece': lambda rng: _bench_place_piece(rng, SparseHexaGrid),
+        'populate_lines': lambda rng: _bench_populate_lines(rng),
+    }
+    for n_tiles in PUZZLE_SIZES:
+        setups[f'ring_search_{n_tiles}'] = lambda rng, n=n_tiles: _bench_ring_search(n)
+    for n_tiles in PUZZLE_SIZES:
+        setups[f'solve_{n_tiles}'] = lambda rng, n=n_tiles: _bench_solve(n)
+    return {name: setup(random.Random(f'{seed}-{name}')) for name, setup in setups.items()}
+
+
+def time_benchmark(run: Callable, repeat: int = 5, min_time: float = 0.2) -> dict:
+    """Best and median time per call of run, in seconds, over repeat rounds of at least min_time seconds each."""
+    run()  # warm up, e.g. lazy imports and caches
+    timer = timeit.Timer(run)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return dict(best=min(times), median=statistics.median(times), number=number)
+
+
+def run_benchmarks(names: List[str] = None, seed: int = 0, repeat: int = 5, min_time: float = 0.2,
+                   verbose: bool = False) -> dict:
+    """Runs the benchmarks, all of them by default, and returns the results with a description of the machine."""
+    benchmarks = get_benchmarks(seed)
+    if names:
+        benchmarks = {name: benchmarks[name] for name in names}
+    results = dict()
+    for name, run in benchmarks.items():
+        results[name] = time_benchmark(run, repeat=repeat, min_time=min_time)
+        if verbose:
+            print(f"{name:<28} {results[name]['best'] * 1E6:12.2f} us", file=sys.stderr)
+    return dict(machine=dict(python=platform.python_version(), implementation=platform.python_implementation(),
+                             system=platform.platform(), processor=platform.processor()),
+                seed=seed, repeat=repeat, results=results)
+
+
+def compare_results(results: dict, baseline: dict, threshold: float = 0.2) -> Dict[str, float]:
+    """Relative change of the best time of each benchmark present in both runs, for those slower than the baseline by
+    more than threshold, e.g. 0.2 for 20%."""
+    regressions = dict()
+    for name, result in results['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        change = result['best'] / reference['best'] - 1
+        if change > threshold:
+            regressions[name] = change
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the solver hot paths.")
+    parser.add_argument('names', nargs='*', help="benchmarks to run, all of them by default")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the random inputs")
+    parser.add_argument('--repeat', type=int, default=5, help="timing rounds per benchmark")
+    parser.add_argument('--min-time', type=float, default=0.2, help="minimum duration of a round, in seconds")
+    parser.add_argument('--output', help="JSON results file, by default the standard output")
+    parser.add_argument('--baseline', help="JSON results of a previous run, to compare with")
+    parser.add_argument('--threshold', type=float, default=0.2, help="relative slowdown flagged as a regression")
+    parser.add_argument('--save-baseline', nargs='?', const=BENCHMARK_BASELINE_PATH,
+                        help=f"also save the results as baseline, by default in {BENCHMARK_BASELINE_PATH}")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.names, seed=args.seed, repeat=args.repeat, min_time=args.min_time, verbose=True)
+    text = json.dumps(results, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    if args.save_baseline is not None:
+        with open(args.save_baseline, 'w') as f:
+            f.write(text + '\n')
+
+    if args.baseline is None:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline['seed'] != results['seed']:
+        print(f"Warning: the baseline was run with seed {baseline['seed']}", file=sys.stderr)
+    regressions = compare_results(results, baseline, args.threshold)
+    for name, change in regressions.items():
+        print(f"REGRESSION {name}: {change:+.1%}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
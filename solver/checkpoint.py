@@ -0,0 +1,76 @@
+"""Checkpoints of long ring searches, so that a solve that gets stopped, e.g. pre-empted, can be resumed where it was
+instead of from scratch. A checkpoint is a small JSON file holding the frontier of the RingSearch, as the (line type,
+orientation) of each tile of the branch being explored, its counters and those of the solve:
+
+    solution, stats = find_solution(pieces, 'r', checkpoint='solve_r.json')
+
+saves the search every minute, and resumes it if the file already exists. The search only checks the clock every
+CHECKPOINT_NODES_MASK + 1 nodes, and a save writes a few hundred bytes, so checkpoints cost well below 1% of a solve.
+The rings found after the last save are found again when resuming. A TranspositionTable is not saved, so a resumed
+search may explore more nodes than an uninterrupted one, but finds the same rings.
+"""
+import json
+import os
+import time
+from collections import Counter
+
+from resources.node import Tree
+
+
+_VERSION = 2
+
+
+class SearchCheckpoint:
+    """Saves the frontier of a RingSearch to filepath every interval seconds, see RingSearch.get_frontier. The counters
+    of the stats, if given, are saved along with it. A file is only resumed by a search of the same ring types, and of
+    the same puzzle, e.g. its get_request_key: the rings before the frontier were only matched with its tiles."""
+    def __init__(self, filepath: str, interval: float = 60., stats=None, puzzle: tuple = None):
+        self.filepath = filepath
+        self.interval = interval
+        self.stats = stats
+        # JSON has no tuples
+        self.puzzle = json.loads(json.dumps(puzzle))
+        self.last_save = time.monotonic()
+        self.n_saves = 0
+        # whether the loaded checkpoint is that of a finished search
+        self.finished = False
+
+    def on_node(self, search):
+        """Called by the search after some placements, saves it if the interval has elapsed."""
+        # while a resumed branch is being placed again, the nodes before it are not explored yet
+        if search.resume is None and time.monotonic() - self.last_save >= self.interval:
+            self.save(search)
+
+    def save(self, search, finished: bool = False):
+        """Saves the current state of the search, or that it is finished, i.e. that no ring is left."""
+        state = dict(version=_VERSION, puzzle=self.puzzle, ring_types=sorted(search.ring_types),
+                     symmetry=search.symmetry, first_type=search.first_type, finished=finished,
+                     branch=search.get_frontier().get_branch(), counters=search.get_counters())
+        if self.stats is not None:
+            state['stats'] = dict(counters=self.stats.counters, timings=self.stats.timings)
+        # write to a temporary file first, so that an interruption during a save never corrupts the checkpoint
+        tmp_filepath = self.filepath + '.tmp'
+        with open(tmp_filepath, 'w') as f:
+            json.dump(state, f, separators=(',', ':'))
+        os.replace(tmp_filepath, self.filepath)
+        self.last_save = time.monotonic()
+        self.n_saves += 1
+
+    def load(self, search) -> [Tree, None]:
+        """Restores the counters saved for a search of the same ring types, and returns the frontier to resume it from,
+        see RingSearch.iter_rings. Returns None if there is no checkpoint, i.e. the search starts from scratch. If the
+        search was finished, self.finished is set and no ring is left to search."""
+        if not os.path.exists(self.filepath):
+            return None
+        with open(self.filepath) as f:
+            state = json.load(f)
+        if state['version'] != _VERSION or state['puzzle'] != self.puzzle or \
+                state['ring_types'] != sorted(search.ring_types) or state['symmetry'] != search.symmetry or \
+                state['first_type'] != search.first_type:
+            raise ValueError(f"{self.filepath} is not a checkpoint of this search")
+        search.set_counters(Counter(state['counters']))
+        if self.stats is not None and 'stats' in state:
+            self.stats.counters.update(state['stats']['counters'])
+            self.stats.timings.update(state['stats']['timings'])
+        self.finished = state['finished']
+        return Tree([tuple(node) for node in state['branch']])
@@ -2,19 +2,21 @@
 
 DavidPerruchoud (created on 29/12/2021)
 """
+from array import array
+from functools import lru_cache
 from itertools import product
-from math import sqrt
+from typing import Dict, Tuple
 
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
-import seaborn as sns
+from resources.hexagon import CODE_COLORS, COLOR_CODES, TantrixHex
 
-from resources.hexagon import TantrixHex
-from resources.common_constants import CommonConstants
 
-
-sns.set_theme('talk')
+# POSITION_OFFSET gives the offset in the grid of the tile adjacent tho the key edge
+POSITION_OFFSET = {0: (-1, 0),
+                   1: (-1, 1),
+                   2: (0, 1),
+                   3: (1, 0),
+                   4: (1, -1),
+                   5: (0, -1)}
 
 
 class OccupiedCell(Exception):
@@ -49,16 +51,10 @@ class HexaCell:
 
     def __str__(self):
         if self.occupied:
-            indices = []
-            colors = []
-            for color, idx in self.lines.items():
-                indices.extend(idx)
-                colors.extend([color, color])
-            ser = pd.Series(data=colors, index=indices).sort_index()
             return f"""
-                        {ser.loc[0]}   {ser.loc[1]}
-                      {ser.loc[5]}       {ser.loc[2]}
-                        {ser.loc[4]}   {ser.loc[3]}
+                        {self.edge_colors[0]}   {self.edge_colors[1]}
+                      {self.edge_colors[5]}       {self.edge_colors[2]}
+                        {self.edge_colors[4]}   {self.edge_colors[3]}
                     """
         return "Cell is unoccupied."
 
@@ -77,23 +73,33 @@ class HexaCell:
         self.edge_colors = piece.edge_colors
         self._populate_lines(self.edge_colors)
 
+    def remove_piece(self):
+        """Remove the tile placed on the cell, leaving it unoccupied."""
+        self.occupied = False
+        self.edge_colors = None
+        self.lines = dict()
+
     def _populate_lines(self, edge_colors: str):
         """Populate the 'lines' attribute according to the placed tile."""
-        color_list = np.array(list(edge_colors))
-        for c in np.unique(color_list):
+        for c in sorted(set(edge_colors)):
             if c == '-':
                 # we ignore those lines
                 continue
-            self.lines[c] = list(np.where(color_list == c)[0])
+            entry = edge_colors.index(c)
+            self.lines[c] = [entry, edge_colors.index(c, entry + 1)]
 
 
 class HexaGrid:
     """Represents the playing area. Builds a X-by-Y grid of hexagonal cells, which can be filled with tiles. This keeps
     track of the position of all placed tiles."""
+    # number of grids created by the process, see SearchStats
+    n_allocations = 0
+
     def __init__(self, grid_size: int = 50):
+        HexaGrid.n_allocations += 1
         self.x_size = grid_size
         self.y_size = grid_size
-        self.grid = np.empty((self.x_size, self.y_size), dtype=HexaCell)
+        self.grid = [[None] * self.y_size for __ in range(self.x_size)]
         self.mid = (int(grid_size / 2), int(grid_size / 2))
         self.occupied_cells = []
 
@@ -102,110 +108,203 @@ class HexaGrid:
     def populate_grid(self):
         """Populate the grid with unoccuped HexaCells"""
         for x, y in product(range(self.x_size), range(self.y_size)):
-            self.grid[x, y] = HexaCell()
+            self.grid[x][y] = HexaCell()
 
     def get_cell(self, x: int, y: int) -> HexaCell:
         """Returns a cell of the Grid."""
-        return self.grid[x, y]
+        return self.grid[x][y]
 
     def place_piece(self, x: int, y: int, piece: TantrixHex):
         """Place a tile in one of the cells."""
         self.get_cell(x, y).place_piece(piece)
         self.occupied_cells.append((x, y))
 
+    def remove_last_piece(self):
+        """Remove the most recently placed tile, e.g. when backtracking during a search."""
+        x, y = self.occupied_cells.pop()
+        self.get_cell(x, y).remove_piece()
+
     def plot_grid(self):
-        """Plots the state of the grid."""
-        # limit the grid size to the minimum necessary:
-        min_x, max_x = np.min([v[0] for v in self.occupied_cells]), np.max([v[0] for v in self.occupied_cells]) + 1
-        min_y, max_y = np.min([v[1] for v in self.occupied_cells]), np.max([v[1] for v in self.occupied_cells]) + 1
-
-        # plot the base grid in grey
-        # for x, y in product(range(min_x, max_x), range(min_y, max_y)):
-        #     center_x = (2 * y + x) * CommonConstants.RI
-        #     center_y = -1.5 * x * CommonConstants.RC
-        #     self.plot_hex_pattern(center_x, center_y)
-
-        # plot the placed tiles
+        """Plots the state of the grid. The plotting libraries are only loaded on first use, see renderer.py."""
+        from solver.renderer import plot_grid
+        plot_grid(self)
+
+    def get_edge_codes(self) -> tuple:
+        """Returns the edge color codes (see TantrixHex) of the smallest part of the grid holding all the placed tiles,
+        as a (x, y, edge) array, the mask of its occupied cells, and the grid coordinates of its first cell."""
+        import numpy as np
+
+        xs, ys = np.array(self.occupied_cells).T
+        min_x, min_y = xs.min(), ys.min()
+        codes = np.zeros((xs.max() - min_x + 1, ys.max() - min_y + 1, 6), dtype=np.int8)
+        occupied = np.zeros(codes.shape[:2], dtype=bool)
         for x, y in self.occupied_cells:
-            center_x = (2 * y + x) * CommonConstants.RI
-            center_y = -1.5 * x * CommonConstants.RC
-            # plot the border in black
-            self.plot_hex_pattern(center_x, center_y, c='k')
-
-            # plot the color lines
-            tile = self.grid[x, y]
-            self.plot_hex_lines(tile, center_x, center_y)
-
-        # make the figure square
-        xlim = plt.xlim()
-        x_dist = xlim[1] - xlim[0]
-        ylim = plt.ylim()
-        y_dist = ylim[1] - ylim[0]
-        max_dist = np.max([x_dist, y_dist])
-
-        plt.xlim((xlim[0], xlim[0] + max_dist))
-        plt.ylim((ylim[0], ylim[0] + max_dist))
-
-    @staticmethod
-    def get_unit_vertices(rc, ri) -> list:
-        """Get the position of the vertices of a HexaCell, with respect to its center. """
-        # TODO compute this only once if performance issues
-        return [(-ri, (rc / 2)),  # NW
-                (0, rc),  # N
-                (0 + ri, (rc / 2)),  # NE
-                (0 + ri, -(rc / 2)),  # SE
-                (0, -rc),  # S
-                (-ri, -(rc / 2)),  # SW
-                ]
-
-    def plot_hex_pattern(self, mid_x: float, mid_y: float, rc: float = None, c: str = 'gray'):
-        """Plots the edges of a single HexaCell."""
-        if rc is None:
-            rc = CommonConstants.RC
-            ri = CommonConstants.RI
-        else:
-            ri = sqrt(3) / 2 * rc
+            codes[x - min_x, y - min_y] = encode_edge_colors(self.get_cell(x, y).edge_colors)
+        occupied[xs - min_x, ys - min_y] = True
+        return codes, occupied, (min_x, min_y)
+
+    def is_grid_valid(self) -> Tuple[bool, list]:
+        """Check that each adjacent tiles have the same color. All the cells are compared at once with their neighbour
+        in each direction, by shifting the array of edge colors. Returns whether the grid is valid, and the (x, y, edge)
+        of the mismatching edges. Each shared edge is only checked, and reported, from the cell on its NW, NE or E."""
+        import numpy as np
+
+        if not self.occupied_cells:
+            return True, []
+        codes, occupied, (min_x, min_y) = self.get_edge_codes()
+
+        mismatches = []
+        for edge in (0, 1, 2):
+            dx, dy = POSITION_OFFSET[edge]
+            cells_x, neighbours_x = _shifted_slices(dx, codes.shape[0])
+            cells_y, neighbours_y = _shifted_slices(dy, codes.shape[1])
+            adjacent = occupied[cells_x, cells_y] & occupied[neighbours_x, neighbours_y]
+            different = codes[cells_x, cells_y, edge] != codes[neighbours_x, neighbours_y, (edge + 3) % 6]
+            for x, y in zip(*np.nonzero(adjacent & different)):
+                mismatches.append((int(x + cells_x.start + min_x), int(y + cells_y.start + min_y), edge))
+        return not mismatches, mismatches
+
+
+def _shifted_slices(offset: int, size: int) -> Tuple[slice, slice]:
+    """Slices of an axis of a grid, and of the same axis shifted by an offset, so that they overlap."""
+    if offset >= 0:
+        return slice(0, size - offset), slice(offset, size)
+    return slice(-offset, size), slice(0, size + offset)
+
+
+@lru_cache(maxsize=None)
+def encode_edge_colors(edge_colors: str) -> array:
+    """The edge colors of a tile, as COLOR_CODES."""
+    return array('b', [COLOR_CODES[c] for c in edge_colors])
+
+
+class CompactHexaGrid(HexaGrid):
+    """Same playing area as HexaGrid, without any HexaCell object: the occupied cells are the bits of an integer, and
+    the edge colors of the tiles are COLOR_CODES (see TantrixHex) in a flat int8 array, six per cell. Both are indexed
+    by the flattened coordinate x * grid_size + y. Placing and removing a tile doesn't allocate anything, and HexaCells
+    are only built on demand by get_cell, e.g. for plotting."""
+    def __init__(self, grid_size: int = 50):
+        HexaGrid.n_allocations += 1
+        self.x_size = grid_size
+        self.y_size = grid_size
+        self.mid = (int(grid_size / 2), int(grid_size / 2))
+        self.occupied_cells = []
+        self.occupancy = 0
+        self.edge_codes = array('b', bytes(self.x_size * self.y_size * 6))
 
-        vertices = self.get_unit_vertices(rc, ri)
-        vertices = [(mid_x + p[0], mid_y + p[1]) for p in vertices]
-        # duplicate the first vertex a the end of the list, to simplify plotting
-        vertices = vertices + [vertices[0], ]
+    def populate_grid(self):
+        """Nothing to do, the cells are unoccupied until a tile is placed."""
+        pass
 
-        for p1, p2 in zip(vertices[:-1], vertices[1:]):
-            plt.plot((p1[0], p2[0]), (p1[1], p2[1]), color=c)
+    def cell_index(self, x: int, y: int) -> int:
+        """Flattened coordinate of a cell."""
+        if not (0 <= x < self.x_size and 0 <= y < self.y_size):
+            raise IndexError(f"Cell ({x}, {y}) is outside of the grid.")
+        return x * self.y_size + y
 
-    def plot_hex_lines(self, tile: HexaCell, mid_x: float, mid_y: float, rc: float = None):
-        """Plots the colored lines of a HexaCell."""
-        if rc is None:
-            rc = CommonConstants.RC
-            ri = CommonConstants.RI
-        else:
-            ri = sqrt(3) / 2 * rc
+    def is_occupied(self, x: int, y: int) -> bool:
+        return bool(self.occupancy >> self.cell_index(x, y) & 1)
 
-        vertices = self.get_unit_vertices(rc, ri)
-        vertices = [(mid_x + p[0], mid_y + p[1]) for p in vertices]
-        # duplicate the first vertex a the end of the list, to simplify plotting
-        vertices = vertices + [vertices[0], ]
+    def get_edge_colors(self, x: int, y: int) -> [str, None]:
+        """Edge colors of the tile placed on a cell, or None if it is unoccupied."""
+        idx = self.cell_index(x, y)
+        if not self.occupancy >> idx & 1:
+            return None
+        return ''.join(CODE_COLORS[code] for code in self.edge_codes[idx * 6:idx * 6 + 6])
 
-        # compute the position of the midpoint
-        midpoints = []
-        for v1, v2 in zip(vertices[:-1], vertices[1:]):
-            midpoints.append(((v1[0] + v2[0]) / 2, (v1[1] + v2[1]) / 2))
+    def get_cell(self, x: int, y: int) -> HexaCell:
+        """Returns a new HexaCell with the content of a cell of the Grid."""
+        return HexaCell(self.get_edge_colors(x, y))
 
-        for c, points in tile.lines.items():
-            if c == '-':
-                # we ignore those other lines
-                continue
-            entry = midpoints[points[0]]
-            exit_ = midpoints[points[1]]
-            plt.plot((entry[0], exit_[0]), (entry[1], exit_[1]), color=c, lw=6)
-
-    def is_grid_valid(self) -> bool:
-        """Check that each adjacent tiles have the same color."""
-        raise NotImplementedError
-        # iterate over each placed tile
-        # find each adjacent placed tiles and iterate
-        # check that the two colors of both adjacent edges match
+    def get_edge_codes(self) -> tuple:
+        """Same as HexaGrid.get_edge_codes, as a view on the array of edge colors."""
+        import numpy as np
+
+        xs, ys = np.array(self.occupied_cells).T
+        min_x, min_y = xs.min(), ys.min()
+        all_codes = np.frombuffer(self.edge_codes, dtype=np.int8).reshape((self.x_size, self.y_size, 6))
+        codes = all_codes[min_x:xs.max() + 1, min_y:ys.max() + 1]
+        occupied = np.zeros(codes.shape[:2], dtype=bool)
+        occupied[xs - min_x, ys - min_y] = True
+        return codes, occupied, (min_x, min_y)
+
+    def place_piece(self, x: int, y: int, piece: TantrixHex):
+        """Place a tile in one of the cells."""
+        idx = self.cell_index(x, y)
+        bit = 1 << idx
+        if self.occupancy & bit:
+            raise OccupiedCell
+        self.occupancy |= bit
+        self.edge_codes[idx * 6:idx * 6 + 6] = encode_edge_colors(piece.edge_colors)
+        self.occupied_cells.append((x, y))
+
+    def remove_last_piece(self):
+        """Remove the most recently placed tile, e.g. when backtracking during a search."""
+        x, y = self.occupied_cells.pop()
+        idx = self.cell_index(x, y)
+        self.occupancy &= ~(1 << idx)
+        self.edge_codes[idx * 6:idx * 6 + 6] = encode_edge_colors('------')
+
+
+class SparseHexaGrid(HexaGrid):
+    """Unbounded playing area, holding only the placed tiles: the edge colors of each occupied cell are kept in a dict
+    keyed by its (x, y) axial coordinates, which can be negative, so that the memory only grows with the number of
+    tiles. mid is (0, 0), and the grid_size is ignored.
+    The bounding box of the placed tiles, (min_x, max_x, min_y, max_y), is updated with each placement, and the
+    previous one is stacked so that removing the last tile restores it in constant time."""
+    def __init__(self, grid_size: int = None):
+        HexaGrid.n_allocations += 1
+        self.mid = (0, 0)
+        self.occupied_cells = []
+        self.cells: Dict[Tuple[int, int], str] = dict()
+        self.bounding_box = None
+        self.bounding_boxes = []
+
+    def populate_grid(self):
+        """Nothing to do, only the occupied cells are stored."""
+        pass
+
+    def is_occupied(self, x: int, y: int) -> bool:
+        return (x, y) in self.cells
+
+    def get_edge_colors(self, x: int, y: int) -> [str, None]:
+        """Edge colors of the tile placed on a cell, or None if it is unoccupied."""
+        return self.cells.get((x, y))
+
+    def get_cell(self, x: int, y: int) -> HexaCell:
+        """Returns a new HexaCell with the content of a cell of the Grid."""
+        return HexaCell(self.cells.get((x, y)))
+
+    def get_edge_codes(self) -> tuple:
+        """Same as HexaGrid.get_edge_codes, only allocating the bounding box of the placed tiles."""
+        import numpy as np
+
+        min_x, max_x, min_y, max_y = self.bounding_box
+        codes = np.zeros((max_x - min_x + 1, max_y - min_y + 1, 6), dtype=np.int8)
+        occupied = np.zeros(codes.shape[:2], dtype=bool)
+        for (x, y), edge_colors in self.cells.items():
+            codes[x - min_x, y - min_y] = encode_edge_colors(edge_colors)
+            occupied[x - min_x, y - min_y] = True
+        return codes, occupied, (min_x, min_y)
+
+    def place_piece(self, x: int, y: int, piece: TantrixHex):
+        """Place a tile in one of the cells."""
+        position = (x, y)
+        if position in self.cells:
+            raise OccupiedCell
+        self.cells[position] = piece.edge_colors
+        self.occupied_cells.append(position)
+        self.bounding_boxes.append(self.bounding_box)
+        if self.bounding_box is None:
+            self.bounding_box = (x, x, y, y)
+        else:
+            min_x, max_x, min_y, max_y = self.bounding_box
+            self.bounding_box = (min(min_x, x), max(max_x, x), min(min_y, y), max(max_y, y))
+
+    def remove_last_piece(self):
+        """Remove the most recently placed tile, e.g. when backtracking during a search."""
+        del self.cells[self.occupied_cells.pop()]
+        self.bounding_box = self.bounding_boxes.pop()
 
 
 if __name__ == '__main__':
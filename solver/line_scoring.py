@@ -0,0 +1,144 @@
+"""Scoring of the free-form "longest line" game: on a board of placed tiles, the lines of a color join from tile to tile
+through the edges they share. Each connected line is either open or a closed loop. A line scores one point per tile,
+and a loop two points per tile, the score of a color being that of its best line or loop.
+
+The lines are joined with a union-find over the colored lines of the tiles, so that a board is scored in linear time.
+maximise_score places a hand of tiles on a board, looking for the placements giving the best score to a color.
+"""
+from typing import Dict, Iterator, List, Tuple
+
+from solver.hexagrid import POSITION_OFFSET, HexaGrid
+from solver.ring_solver import find_solution
+
+
+def _find(parents: List[int], node: int) -> int:
+    root = node
+    while parents[root] != root:
+        root = parents[root]
+    # path compression
+    while parents[node] != root:
+        parents[node], node = root, parents[node]
+    return root
+
+
+def score_lines(cells: Dict[Tuple[int, int], str], colors: str = 'rbyg') -> Dict[str, dict]:
+    """Longest line, longest loop, number of loops and score of each color, for a board given by the edge colors of
+    the tile on each (x, y) position. Only the adjacent edges of the same color are joined, so the board doesn't need to
+    be valid. The lengths are numbers of tiles."""
+    nodes = dict()  # (position, color) of each line of a tile -> node
+    for position, edge_colors in cells.items():
+        for color in edge_colors:
+            if color in colors and (position, color) not in nodes:
+                nodes[(position, color)] = len(nodes)
+    parents = list(range(len(nodes)))
+    sizes = [1] * len(nodes)
+    n_joins = [0] * len(nodes)
+
+    for (position, color), node in nodes.items():
+        edge_colors = cells[position]
+        # each shared edge is seen from both of its cells, only the NW, NE and E ones are joined
+        for edge in (0, 1, 2):
+            if edge_colors[edge] != color:
+                continue
+            offset = POSITION_OFFSET[edge]
+            neighbour = nodes.get(((position[0] + offset[0], position[1] + offset[1]), color))
+            if neighbour is None or cells[(position[0] + offset[0], position[1] + offset[1])][edge + 3] != color:
+                continue
+            root, neighbour_root = _find(parents, node), _find(parents, neighbour)
+            if root == neighbour_root:
+                # the line closes onto itself
+                n_joins[root] += 1
+                continue
+            if sizes[root] < sizes[neighbour_root]:
+                root, neighbour_root = neighbour_root, root
+            parents[neighbour_root] = root
+            sizes[root] += sizes[neighbour_root]
+            n_joins[root] += n_joins[neighbour_root] + 1
+
+    scores = {color: dict(longest_line=0, longest_loop=0, loops=0, score=0) for color in colors}
+    for (__, color), node in nodes.items():
+        if parents[node] != node:
+            continue
+        color_score = scores[color]
+        # a line of n tiles has n - 1 joins, a loop has n
+        if n_joins[node] == sizes[node]:
+            color_score['loops'] += 1
+            color_score['longest_loop'] = max(color_score['longest_loop'], sizes[node])
+        else:
+            color_score['longest_line'] = max(color_score['longest_line'], sizes[node])
+    for color_score in scores.values():
+        color_score['score'] = max(color_score['longest_line'], 2 * color_score['longest_loop'])
+    return scores
+
+
+def get_grid_cells(grid: HexaGrid) -> Dict[Tuple[int, int], str]:
+    """The edge colors of the tile on each occupied cell of a grid."""
+    return {(x, y): grid.get_cell(x, y).edge_colors for x, y in grid.occupied_cells}
+
+
+def score_grid(grid: HexaGrid, colors: str = 'rbyg') -> Dict[str, dict]:
+    """Same as score_lines, for the tiles placed on a grid."""
+    return score_lines(get_grid_cells(grid), colors)
+
+
+def iter_moves(cells: Dict[Tuple[int, int], str], tile) -> Iterator[Tuple[int, Tuple[int, int], str]]:
+    """Yields the legal (rotation, position, edge colors) of a tile on a board: on a free cell next to a placed tile,
+    or on (0, 0) if the board is empty, with the same color as each adjacent tile on their shared edges. The rotations
+    giving the same edge colors are only yielded once."""
+    if not cells:
+        free_cells = [(0, 0)]
+    else:
+        free_cells = {(x + dx, y + dy) for x, y in cells for dx, dy in POSITION_OFFSET.values()} - cells.keys()
+    rotations = dict()
+    for rotation in range(6):
+        rotations.setdefault(tile.get_rotated_edge_colors(rotation), rotation)
+
+    for position in sorted(free_cells):
+        neighbours = []
+        for edge, (dx, dy) in POSITION_OFFSET.items():
+            neighbour_colors = cells.get((position[0] + dx, position[1] + dy))
+            if neighbour_colors is not None:
+                neighbours.append((edge, neighbour_colors[(edge + 3) % 6]))
+        for edge_colors, rotation in rotations.items():
+            if all(edge_colors[edge] == color for edge, color in neighbours):
+                yield rotation, position, edge_colors
+
+
+def maximise_score(hand: list, color: str, cells: Dict[Tuple[int, int], str] = None, beam_width: int = 16,
+                   rings: bool = True) -> Tuple[int, list]:
+    """Places all the tiles of a hand, one at a time, with legal moves (see iter_moves), so that the score of a color
+    is the best. This is a beam search: after each tile, only the beam_width best boards are kept, the ties being broken
+    by the length of the longest line and loop of that color. Returns the score and the placements, as (tile, rotation,
+    position), of as many tiles as could be placed.
+    A loop through all the tiles is the best possible score, but the beam search can hardly find one, as a loop only
+    scores once closed. With rings, on an empty board, with at least 3 tiles which all have a line of that color, such a
+    loop is first searched with find_solution."""
+    cells = dict() if cells is None else dict(cells)
+    if rings and not cells and len(hand) >= 3 and all(tile.line_types.get(color) for tile in hand):
+        solution, __ = find_solution(list(hand), color, validate=False)
+        if solution is not None:
+            return 2 * len(hand), solution
+    beam = [(cells, tuple(hand), [])]
+    best = (score_lines(cells, color)[color]['score'], [])
+    while beam:
+        candidates = dict()
+        for board, remaining, placements in beam:
+            tried = set()
+            for tile_idx, tile in enumerate(remaining):
+                if tile.original_edge_colors in tried:
+                    continue
+                tried.add(tile.original_edge_colors)
+                left = remaining[:tile_idx] + remaining[tile_idx + 1:]
+                for rotation, position, edge_colors in iter_moves(board, tile):
+                    new_board = {**board, position: edge_colors}
+                    key = frozenset(new_board.items())
+                    if key in candidates:
+                        continue
+                    color_score = score_lines(new_board, color)[color]
+                    rank = (color_score['score'], color_score['longest_line'] + color_score['longest_loop'])
+                    candidates[key] = (rank, new_board, left, placements + [(tile, rotation, position)])
+        ranked = sorted(candidates.values(), key=lambda candidate: candidate[0], reverse=True)[:beam_width]
+        beam = [(board, remaining, placements) for __, board, remaining, placements in ranked]
+        if ranked:
+            best = (ranked[0][0][0], ranked[0][3])
+    return best
@@ -0,0 +1,102 @@
+import multiprocessing
+import os
+from collections import Counter
+from typing import Callable, List, Tuple
+
+from solver.hexagrid import HexaGrid
+from solver.ring_library import RingLibrary, composition, get_default_library, get_ring_types
+from solver.ring_search import RingSearch
+from solver.search_stats import SearchStats
+from solver.tile_matching import match_rings
+
+
+# state shared by all the jobs of a worker process, set once when the pool starts
+_worker_state = dict()
+
+
+def _init_worker(pieces: list, color: str, ring_types: list):
+    _worker_state.update(pieces=pieces, color=color, ring_types=ring_types)
+
+
+def _encode_solution(solution: [list, None]) -> [list, None]:
+    """The tiles of a worker are copies, so solutions are sent back with the index of the tiles instead."""
+    if solution is None:
+        return None
+    pieces = _worker_state['pieces']
+    return [(pieces.index(tile), rotation, position) for tile, rotation, position in solution]
+
+
+def _solve_prefix(prefix: List[Tuple[int, int]]) -> Tuple[[list, None], SearchStats]:
+    """Job searching the rings starting with a prefix, and fitting the tiles on them."""
+    stats = SearchStats()
+    n_allocations = HexaGrid.n_allocations
+    search = RingSearch(_worker_state['ring_types'])
+    solution = match_rings(_worker_state['pieces'], search.iter_rings(prefix=prefix), _worker_state['color'], stats)
+    counters = search.get_counters()
+    # the nodes of the prefix were already counted by split_search
+    counters['nodes'] -= len(prefix)
+    stats.set_counters(counters)
+    stats.counters['grid_allocations'] += HexaGrid.n_allocations - n_allocations
+    return _encode_solution(solution), stats
+
+
+def _solve_ring(ring: Tuple[tuple, tuple]) -> Tuple[[list, None], SearchStats]:
+    """Job fitting the tiles on a ring from the library."""
+    stats = SearchStats()
+    solution = match_rings(_worker_state['pieces'], [ring], _worker_state['color'], stats)
+    return _encode_solution(solution), stats
+
+
+def split_search(ring_types: list, n_shards: int) -> Tuple[List[List[Tuple[int, int]]], Counter]:
+    """Split the ring search into independent prefixes, adding tiles to the prefixes until there are at least n_shards
+    of them. Returns the prefixes and the counters of the search that built them."""
+    n_tiles = 2
+    while True:
+        search = RingSearch(ring_types)
+        prefixes = list(search.iter_prefixes(n_tiles))
+        if len(prefixes) >= n_shards or n_tiles >= len(ring_types) - 1:
+            return prefixes, search.get_counters()
+        n_tiles += 1
+
+
+def parallel_solve(pieces: list, color: str, workers: int = None, library: RingLibrary = None,
+                   progress: bool = True) -> Tuple[[list, None], SearchStats]:
+    """Same as solve, without plotting, with the search split across a pool of worker processes. The rings are split by
+    their first tiles, or taken from the library. All the workers are stopped as soon as one of them finds a solution.
+    Returns the solution, as in search_ring_permutations, and the merged SearchStats of the jobs that completed."""
+    if workers is None:
+        workers = os.cpu_count()
+    if library is None:
+        library = get_default_library()
+    stats = SearchStats()
+    ring_types = get_ring_types(pieces, color)
+    if ring_types is None:
+        return None, stats
+
+    key = composition(ring_types)
+    if key in library:
+        job: Callable = _solve_ring
+        shards = list(library.iter_rings(key))
+    else:
+        job = _solve_prefix
+        # more shards than workers, so that a hard shard doesn't keep the other workers waiting
+        with stats.timer('ring_search'):
+            shards, counters = split_search(ring_types, workers * 8)
+        stats.counters.update(counters)
+
+    if progress:
+        from tqdm import tqdm
+    else:
+        def tqdm(iterable, **kwargs):
+            return iterable
+
+    solution = None
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(pieces, color, ring_types)) as pool:
+        for shard_solution, shard_stats in tqdm(pool.imap_unordered(job, shards), total=len(shards)):
+            stats.merge(shard_stats)
+            if shard_solution is not None:
+                solution = [(pieces[tile_idx], rotation, position) for tile_idx, rotation, position in shard_solution]
+                # leaving the context terminates the workers still running
+                break
+    stats.counters['shards'] = len(shards)
+    return solution, stats
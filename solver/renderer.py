@@ -0,0 +1,170 @@
+"""Plotting of the grids. This is the only module importing matplotlib and seaborn, and it is only imported when
+something gets plotted, so that solving puzzles doesn't need them.
+
+A board is drawn with two collections, whatever its number of tiles: a PolyCollection of the hexagons and a
+LineCollection of their colored lines, both computed from the unit hexagon, which is only computed once. In interactive
+mode, the collections of the figure are updated in place for each search node, rather than redrawing the whole figure.
+"""
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+import matplotlib.pyplot as plt
+import numpy as np
+import seaborn as sns
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+
+from resources.common_constants import CommonConstants
+
+
+sns.set_theme('talk')
+
+
+def get_unit_vertices(rc, ri) -> list:
+    """Get the position of the vertices of a HexaCell, with respect to its center. """
+    return [(-ri, (rc / 2)),  # NW
+            (0, rc),  # N
+            (0 + ri, (rc / 2)),  # NE
+            (0 + ri, -(rc / 2)),  # SE
+            (0, -rc),  # S
+            (-ri, -(rc / 2)),  # SW
+            ]
+
+
+UNIT_VERTICES = np.array(get_unit_vertices(CommonConstants.RC, CommonConstants.RI))
+# the midpoint of edge i is between the vertices i and i + 1
+UNIT_MIDPOINTS = (UNIT_VERTICES + np.roll(UNIT_VERTICES, -1, axis=0)) / 2
+
+
+@lru_cache(maxsize=None)
+def get_color_lines(edge_colors: str) -> Tuple[Tuple[str, int, int], ...]:
+    """The (color, entry edge, exit edge) of each colored line of a tile."""
+    return tuple((color, edge_colors.index(color), edge_colors.rindex(color))
+                 for color in sorted(set(edge_colors) - {'-'}))
+
+
+def get_cell_centers(positions: np.ndarray) -> np.ndarray:
+    """Centers of the cells at the (x, y) grid positions, one per row."""
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    return np.column_stack(((2 * positions[:, 1] + positions[:, 0]) * CommonConstants.RI,
+                            -1.5 * positions[:, 0] * CommonConstants.RC))
+
+
+def get_board_cells(grid) -> List[Tuple[tuple, str]]:
+    """The (position, edge colors) of each tile placed on a HexaGrid."""
+    return [((x, y), grid.get_cell(x, y).edge_colors) for x, y in grid.occupied_cells]
+
+
+def get_solution_cells(solution: list) -> List[Tuple[tuple, str]]:
+    """The (position, edge colors) of each tile of a solution, as returned by find_solution, without placing it."""
+    return [(position, tile.get_rotated_edge_colors(rotation)) for tile, rotation, position in solution]
+
+
+def get_grid_limits(grid) -> [tuple, None]:
+    """The (x_min, x_max, y_min, y_max) frame of the tiles of a grid, from the bounding box of its cells maintained by a
+    SparseHexaGrid, or None for the other grids. The columns are slanted, so the frame may be wider than the tiles."""
+    bounding_box = getattr(grid, 'bounding_box', None)
+    if bounding_box is None:
+        return None
+    min_x, max_x, min_y, max_y = bounding_box
+    (x_min, y_max), (x_max, y_min) = get_cell_centers([(min_x, min_y), (max_x, max_y)])
+    margin = CommonConstants.RC * 1.5
+    return float(x_min - margin), float(x_max + margin), float(y_min - margin), float(y_max + margin)
+
+
+def get_board_geometry(cells: List[Tuple[tuple, str]]) -> Tuple[np.ndarray, np.ndarray, list]:
+    """The hexagons of the cells, as an (n, 6, 2) array of vertices, and their colored lines, as an (m, 2, 2) array of
+    segments with the list of their colors."""
+    if not cells:
+        return np.empty((0, 6, 2)), np.empty((0, 2, 2)), []
+    centers = get_cell_centers([position for position, __ in cells])
+    hexagons = centers[:, np.newaxis, :] + UNIT_VERTICES[np.newaxis, :, :]
+
+    line_cells, line_edges, line_colors = [], [], []
+    for cell_idx, (__, edge_colors) in enumerate(cells):
+        for color, entry, exit_ in get_color_lines(edge_colors):
+            line_cells.append(cell_idx)
+            line_edges.append((entry, exit_))
+            line_colors.append(color)
+    segments = centers[line_cells][:, np.newaxis, :] + UNIT_MIDPOINTS[np.array(line_edges, dtype=int).reshape(-1, 2)]
+    return hexagons, segments, line_colors
+
+
+class BoardPlot:
+    """The two collections drawing a board on an Axes. update() replaces the tiles drawn, without clearing the Axes."""
+    def __init__(self, ax, line_width: float = 6):
+        self.ax = ax
+        self.hexagons = PolyCollection([], facecolors='none', edgecolors='k')
+        self.lines = LineCollection([], linewidths=line_width, capstyle='round')
+        ax.add_collection(self.hexagons)
+        ax.add_collection(self.lines)
+        ax.set_aspect('equal')
+        ax.set_xticks([])
+        ax.set_yticks([])
+
+    def update(self, cells: List[Tuple[tuple, str]], limits: tuple = None):
+        """Draw the cells, see get_board_cells, and zoom on the given (x_min, x_max, y_min, y_max), e.g. from
+        get_grid_limits, or else on the cells."""
+        hexagons, segments, colors = get_board_geometry(cells)
+        self.hexagons.set_verts(hexagons)
+        self.lines.set_segments(segments)
+        self.lines.set_color(colors)
+        if limits is None and len(hexagons):
+            (x_min, y_min), (x_max, y_max) = hexagons.min(axis=(0, 1)), hexagons.max(axis=(0, 1))
+            margin = CommonConstants.RC / 2
+            limits = (x_min - margin, x_max + margin, y_min - margin, y_max + margin)
+        if limits is not None:
+            self.ax.set_xlim(limits[:2])
+            self.ax.set_ylim(limits[2:])
+
+
+def plot_grid(grid, ax=None) -> BoardPlot:
+    """Plots the state of a HexaGrid, on the current Axes by default."""
+    board = BoardPlot(plt.gca() if ax is None else ax)
+    board.update(get_board_cells(grid), limits=get_grid_limits(grid))
+    return board
+
+
+class SearchPlot:
+    """Interactive figure of a search, updated in place for each node."""
+    def __init__(self, n_tiles: int):
+        plt.ion()
+        self.figure = plt.figure(figsize=(10, 10))
+        self.board = BoardPlot(self.figure.gca())
+        self.n_tiles = n_tiles
+
+    def update(self, grid, title):
+        """Draws the current state of a search, in a fixed frame around the first tile."""
+        mid_x, mid_y = get_cell_centers(grid.mid)[0]
+        half_span = (self.n_tiles + 1) * CommonConstants.RC * 1.5
+        self.board.update(get_board_cells(grid), limits=(mid_x - half_span, mid_x + half_span,
+                                                          mid_y - half_span, mid_y + half_span))
+        self.board.ax.set_title(title)
+        self.figure.canvas.draw_idle()
+        plt.pause(1E-9)
+
+    def show(self, grid):
+        """Draws a grid, e.g. a solution, and blocks until the figure is closed."""
+        self.board.update(get_board_cells(grid), limits=get_grid_limits(grid))
+        self.board.ax.set_title('')
+        plt.ioff()
+        plt.show()
+
+
+def export_boards(boards: Iterable[List[Tuple[tuple, str]]], filepath_pattern: str, figsize: tuple = (4, 4),
+                  dpi: int = 100) -> List[str]:
+    """Saves each board, given by its cells (see get_board_cells and get_solution_cells), in its own file, named by
+    filepath_pattern.format(idx), e.g. 'solution_{:04d}.svg'. The format is given by the extension. A single figure
+    is reused for all the boards, outside of pyplot, so that no window is opened. Returns the paths of the files."""
+    figure = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(figure)
+    board = BoardPlot(figure.add_axes((0, 0, 1, 1)), line_width=figsize[0])
+    board.ax.set_axis_off()
+    filepaths = []
+    for idx, cells in enumerate(boards):
+        board.update(cells)
+        filepath = filepath_pattern.format(idx)
+        figure.savefig(filepath)
+        filepaths.append(filepath)
+    return filepaths
@@ -0,0 +1,129 @@
+"""Batched ring walk: all the orientations of the tiles of a type permutation are walked at once with numpy, instead of
+one candidate at a time. Each row of an orientation matrix is a possibility, as in search_ring_permutations:
+
+- the exit of each tile is a cumulative sum of the turns, modulo 6, see ring_path,
+- the position of each tile is a cumulative sum of the offsets of the previous exits, see POSITION_OFFSET,
+- a ring is closed when its last tile sits on the NW neighbour of the first one and exits on its SE edge, and valid when
+  no two tiles share a cell, which is checked on the sorted cells of each row.
+
+This is a full enumeration, without any pruning, so RingSearch is faster for large rings. It is a simple reference for
+the mid-size ones, e.g. to check the search and the ring library.
+"""
+from functools import lru_cache
+from typing import Iterator, Tuple
+
+import numpy as np
+from more_itertools import distinct_permutations
+
+from solver.hexagrid import POSITION_OFFSET
+
+
+# offset of each exit direction, as a (6, 2) table
+OFFSET_TABLE = np.array([POSITION_OFFSET[edge] for edge in range(6)], dtype=np.int16)
+
+
+def orientation_matrix(perm: tuple) -> np.ndarray:
+    """Every possibility of a type permutation, as a (m, n - 1) matrix of 1 and -1. The straight lines (type 3) take
+    the same path in both orientations, so they are only given the orientation 1, as in RingSearch."""
+    free = [idx for idx, tile_type in enumerate(perm[1:]) if tile_type != 3]
+    orientations = np.ones((2 ** len(free), len(perm) - 1), dtype=np.int16)
+    orientations[:, free] = _all_orientations(len(free))
+    return orientations
+
+
+@lru_cache(maxsize=None)
+def _all_orientations(n_orientations: int) -> np.ndarray:
+    """The (2 ** n, n) matrix of all the combinations of 1 and -1, in the order of itertools.product([-1, 1]). It is
+    shared, and must not be modified."""
+    bits = (np.arange(2 ** n_orientations)[:, np.newaxis] >> np.arange(n_orientations)[::-1]) & 1
+    return (2 * bits - 1).astype(np.int16)
+
+
+def get_exits(perms: np.ndarray, orientations: np.ndarray) -> np.ndarray:
+    """The exit of each tile, as a (m, n) matrix, for each row of type permutations, (m, n) or a single one, and of
+    orientations, (m, n - 1)."""
+    perms = np.broadcast_to(np.asarray(perms, dtype=np.int16), (len(orientations), orientations.shape[1] + 1))
+    # each tile exits on its entry, the opposite of the previous exit, plus its turn
+    exits = np.empty(perms.shape, dtype=np.int16)
+    exits[:, 0] = perms[:, 0]
+    np.cumsum(3 + orientations * perms[:, 1:], axis=1, out=exits[:, 1:])
+    exits[:, 1:] += perms[:, :1]
+    exits %= 6
+    return exits
+
+
+def get_positions(exits: np.ndarray) -> np.ndarray:
+    """The position of each tile relative to the first one, as a (m, n, 2) array, for each row of exits: each tile is
+    on the neighbour of the previous one on its exit."""
+    positions = np.zeros(exits.shape + (2, ), dtype=np.int16)
+    np.cumsum(OFFSET_TABLE[exits[:, :-1]], axis=1, out=positions[:, 1:])
+    return positions
+
+
+def walk_rings(perms: np.ndarray, orientations: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """The exits, see get_exits, and the positions, see get_positions, of each row of type permutations and
+    orientations."""
+    exits = get_exits(perms, orientations)
+    return exits, get_positions(exits)
+
+
+def closed_rings_mask(perms: np.ndarray, orientations: np.ndarray) -> np.ndarray:
+    """Whether each row of type permutations and orientations, see walk_rings, gives a closed ring, without any tile
+    on top of another. The rows are filtered step by step, so that only the few closed ones are fully walked."""
+    n_tiles = orientations.shape[1] + 1
+    perms = np.broadcast_to(np.asarray(perms, dtype=np.int16), (len(orientations), n_tiles))
+    # the last exit is the sum of the turns
+    closed = (perms[:, 0] + (orientations * perms[:, 1:]).sum(axis=1) + 3 * (n_tiles - 1)) % 6 == 3
+    exits = get_exits(perms[closed], orientations[closed])
+    # the last position is the sum of the offsets
+    last_positions = OFFSET_TABLE[exits[:, :-1]].sum(axis=1)
+    ends_next_to_first = (last_positions[:, 0] == POSITION_OFFSET[0][0]) & \
+        (last_positions[:, 1] == POSITION_OFFSET[0][1])
+    closed[closed] = ends_next_to_first
+    positions = get_positions(exits[ends_next_to_first]).astype(np.int32)
+    # the positions are within n_tiles of the first tile, so they can be packed in a single integer
+    cells = (positions[:, :, 0] + n_tiles) * (2 * n_tiles + 1) + positions[:, :, 1] + n_tiles
+    cells.sort(axis=1)
+    closed[closed] = (np.diff(cells, axis=1) != 0).all(axis=1)
+    return closed
+
+
+def iter_closed_rings(perm: tuple) -> Iterator[Tuple[tuple, tuple]]:
+    """Yields the (perm, possibility) of every closed ring of a type permutation."""
+    orientations = orientation_matrix(perm)
+    for row in orientations[closed_rings_mask(perm, orientations)]:
+        yield perm, tuple(int(orientation) for orientation in row)
+
+
+def iter_batched_rings(ring_types: list, chunk_size: int = 1 << 16) -> Iterator[Tuple[tuple, tuple]]:
+    """Yields every closed ring that can be built with a multiset of line types, the first tile being of type
+    ring_types[0], like a RingSearch without symmetry. The permutations are walked by groups, with all their
+    orientations at once, in chunks of about chunk_size rows to bound the memory."""
+    perms = (tuple((ring_types[0], ) + perm) for perm in distinct_permutations(ring_types[1:]))
+    while True:
+        group_perms, group_orientations, n_rows = [], [], 0
+        for perm in perms:
+            orientations = orientation_matrix(perm)
+            group_perms.append(np.broadcast_to(np.array(perm, dtype=np.int16), (len(orientations), len(perm))))
+            group_orientations.append(orientations)
+            n_rows += len(orientations)
+            if n_rows >= chunk_size:
+                break
+        if not n_rows:
+            return
+        group_perms, group_orientations = np.concatenate(group_perms), np.concatenate(group_orientations)
+        closed = closed_rings_mask(group_perms, group_orientations)
+        for perm, possibility in zip(group_perms[closed].tolist(), group_orientations[closed].tolist()):
+            yield tuple(perm), tuple(possibility)
+
+
+if __name__ == '__main__':
+    from resources.data_loader import populate_tantrix_hexagons
+    from solver.ring_search import RingSearch
+
+    pieces = populate_tantrix_hexagons()
+    for n_tiles in range(3, 11):
+        ring_types_ = [p.line_types.get(pieces[n_tiles - 1].back_color) for p in pieces[:n_tiles]]
+        rings = sorted(iter_batched_rings(ring_types_))
+        assert rings == sorted(RingSearch(ring_types_, symmetry=False).iter_rings())
+        print(f"{n_tiles} tiles: {len(rings)} rings.")
@@ -0,0 +1,154 @@
+import os
+import struct
+from collections import Counter
+from typing import Dict, Iterator, List, Tuple
+
+from solver.ring_search import RingSearch, turns_to_ring
+
+
+RING_LIBRARY_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'resources', 'ring_shapes.bin')
+
+# file layout: header, then one record per composition: (n1, n2, n3, number of shapes), followed by the turn sequences
+# of the shapes, packed two turns per byte
+_MAGIC = b'TXRL'
+_VERSION = 1
+_HEADER = struct.Struct('<4sB')
+_RECORD = struct.Struct('<BBBI')
+
+
+def composition(ring_types: list) -> Tuple[int, int, int]:
+    """The (n1, n2, n3) count of direct, curve and across lines of a ring. The ring shapes only depend on it."""
+    counts = Counter(ring_types)
+    return counts[1], counts[2], counts[3]
+
+
+def get_ring_types(pieces: list, color: str) -> [list, None]:
+    """The line type of the given color of each tile, or None if the tiles can't form any ring of that color: if there
+    are fewer than 3 of them, or if one of them has no line of that color."""
+    ring_types = [tile.line_types.get(color) for tile in pieces]
+    if len(ring_types) < 3 or None in ring_types:
+        return None
+    return ring_types
+
+
+def iter_compositions(n_tiles: int) -> Iterator[Tuple[int, int, int]]:
+    """Yields every (n1, n2, n3) composition of n_tiles."""
+    for n1 in range(n_tiles + 1):
+        for n2 in range(n_tiles - n1 + 1):
+            yield n1, n2, n_tiles - n1 - n2
+
+
+def _pack_turns(turns: tuple) -> bytes:
+    nibbles = [turn + 2 for turn in turns]  # 0 -> 4
+    if len(nibbles) % 2:
+        nibbles.append(0)
+    return bytes(low | (high << 4) for low, high in zip(nibbles[::2], nibbles[1::2]))
+
+
+def _unpack_turns(data: bytes, n_tiles: int) -> tuple:
+    turns = []
+    for byte in data:
+        turns.append((byte & 0x0F) - 2)
+        turns.append((byte >> 4) - 2)
+    return tuple(turns[:n_tiles])
+
+
+class RingLibrary:
+    """Closed ring shapes, indexed by the composition of their line types. Each shape is stored once per symmetry
+    class, as the canonical turn sequence found by RingSearch (see canonical_turns), so that solving a puzzle whose
+    composition was already enumerated is a lookup. A composition stored with no shape cannot form any ring.
+    The library is kept in a compact binary file, built once with build()."""
+    def __init__(self, filepath: str = None):
+        self.filepath = RING_LIBRARY_PATH if filepath is None else filepath
+        self.shapes: Dict[Tuple[int, int, int], List[tuple]] = dict()
+        if os.path.exists(self.filepath):
+            self.load()
+
+    def __contains__(self, key: Tuple[int, int, int]) -> bool:
+        return key in self.shapes
+
+    def __len__(self) -> int:
+        return len(self.shapes)
+
+    def get(self, key: Tuple[int, int, int]) -> [List[tuple], None]:
+        """Returns the turn sequences of the shapes of a composition, or None if it was not enumerated."""
+        return self.shapes.get(key)
+
+    def iter_rings(self, key: Tuple[int, int, int]) -> Iterator[Tuple[tuple, tuple]]:
+        """Yields the shapes of a composition as (perm, possibility) pairs, as RingSearch.iter_rings would."""
+        for turns in self.shapes[key]:
+            yield turns_to_ring(turns)
+
+    def add(self, key: Tuple[int, int, int], shapes: List[tuple]):
+        self.shapes[key] = list(shapes)
+
+    def enumerate(self, key: Tuple[int, int, int]) -> List[tuple]:
+        """Search all the shapes of a composition, and add them to the library."""
+        n1, n2, n3 = key
+        ring_types = [1] * n1 + [2] * n2 + [3] * n3
+        shapes = []
+        if len(ring_types) >= 3:
+            search = RingSearch(ring_types)
+            for __ in search.iter_rings():
+                shapes.append(tuple(search.turns))
+        self.add(key, shapes)
+        return shapes
+
+    def build(self, max_n: int, min_n: int = 3, save: bool = True):
+        """Enumerate the shapes of every composition from min_n up to max_n tiles, skipping those already known. The
+        number of shapes grows exponentially with the number of tiles, so max_n should stay reasonable."""
+        for n_tiles in range(min_n, max_n + 1):
+            for key in iter_compositions(n_tiles):
+                if key not in self:
+                    self.enumerate(key)
+            if save:
+                # save after each size, so that a long build can be interrupted
+                self.save()
+
+    def load(self):
+        with open(self.filepath, 'rb') as f:
+            data = f.read()
+        magic, version = _HEADER.unpack_from(data)
+        assert magic == _MAGIC and version == _VERSION, f"{self.filepath} is not a ring library"
+        offset = _HEADER.size
+        shapes = dict()
+        while offset < len(data):
+            n1, n2, n3, n_shapes = _RECORD.unpack_from(data, offset)
+            offset += _RECORD.size
+            n_tiles = n1 + n2 + n3
+            shape_size = (n_tiles + 1) // 2
+            shapes[(n1, n2, n3)] = [_unpack_turns(data[start:start + shape_size], n_tiles)
+                                    for start in range(offset, offset + n_shapes * shape_size, shape_size)]
+            offset += n_shapes * shape_size
+        self.shapes = shapes
+
+    def save(self):
+        chunks = [_HEADER.pack(_MAGIC, _VERSION)]
+        for key in sorted(self.shapes):
+            chunks.append(_RECORD.pack(*key, len(self.shapes[key])))
+            chunks.extend(_pack_turns(turns) for turns in self.shapes[key])
+        # write to a temporary file first, so that an interrupted save never corrupts the library
+        tmp_filepath = self.filepath + '.tmp'
+        with open(tmp_filepath, 'wb') as f:
+            f.write(b''.join(chunks))
+        os.replace(tmp_filepath, self.filepath)
+
+
+_default_library = None
+
+
+def get_default_library() -> RingLibrary:
+    """The library stored in the resources folder, loaded on first use."""
+    global _default_library
+    if _default_library is None:
+        _default_library = RingLibrary()
+    return _default_library
+
+
+if __name__ == '__main__':
+    import sys
+
+    max_n_ = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    library = RingLibrary()
+    library.build(max_n_)
+    print(f"{len(library)} compositions, {sum(len(v) for v in library.shapes.values())} ring shapes.")
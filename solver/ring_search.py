@@ -0,0 +1,366 @@
+from collections import Counter
+from typing import Callable, Iterator, List, Tuple
+
+from resources.hexagon import TantrixHex
+from resources.node import Tree
+from solver.hexagrid import POSITION_OFFSET, OccupiedCell, SparseHexaGrid
+from solver.transposition import TranspositionTable
+
+
+TILES = {1: 'rr----',
+         2: 'r-r---',
+         3: 'r--r--'}
+# a search checks whether a checkpoint is due every CHECKPOINT_NODES_MASK + 1 nodes
+CHECKPOINT_NODES_MASK = 0x3FF
+
+
+def hex_distance(position_a: tuple, position_b: tuple) -> int:
+    """Number of steps between two cells of the grid. The (x, y) grid coordinates are axial coordinates, the six
+    neighbours being given by POSITION_OFFSET."""
+    dx = position_b[0] - position_a[0]
+    dy = position_b[1] - position_a[1]
+    return (abs(dx) + abs(dy) + abs(dx + dy)) // 2
+
+
+def ring_to_turns(perm: tuple, possibility: tuple) -> tuple:
+    """Describe a ring by the turn taken on each tile, in 60 degrees steps: -2 and 2 for the direct lines, -1 and 1 for
+    the curves, and 0 for the straight lines. The turn sequence doesn't depend on where the ring is placed on the grid,
+    and the first tile always takes the short curve CW, as in RingSearch."""
+    return (perm[0] - 3, ) + tuple(-orientation * (3 - tile_type)
+                                   for tile_type, orientation in zip(perm[1:], possibility))
+
+
+def turns_to_ring(turns: tuple) -> Tuple[tuple, tuple]:
+    """Inverse of ring_to_turns. The first turn must not be positive."""
+    assert turns[0] <= 0
+    perm = tuple(3 - abs(turn) for turn in turns)
+    possibility = tuple(-1 if turn > 0 else 1 for turn in turns[1:])
+    return perm, possibility
+
+
+def _ring_transforms(turns: tuple) -> Iterator[tuple]:
+    """Yields the turn sequences of the same ring traced from each of its tiles, in both directions, and of its mirror
+    image. Tracing the ring backwards reverses the sequence and flips the sign of each turn, mirroring it only flips the
+    signs."""
+    reversed_turns = turns[::-1]
+    for sequence in (turns, reversed_turns,
+                     tuple(-turn for turn in turns), tuple(-turn for turn in reversed_turns)):
+        for shift in range(len(sequence)):
+            yield sequence[shift:] + sequence[:shift]
+
+
+def canonical_turns(turns: tuple) -> tuple:
+    """Representative of all the equivalent turn sequences of a ring: the lexicographically smallest one."""
+    return min(_ring_transforms(turns))
+
+
+def equivalent_rings(perm: tuple, possibility: tuple) -> Iterator[Tuple[tuple, tuple]]:
+    """Yields every distinct (perm, possibility) pair describing the same ring, or its mirror image, as the given one.
+    This expands the representative found by a RingSearch with symmetry back to all its concrete placements."""
+    seen = set()
+    for turns in _ring_transforms(ring_to_turns(perm, possibility)):
+        if turns[0] <= 0 and turns not in seen:
+            seen.add(turns)
+            yield turns_to_ring(turns)
+
+
+def distinct_placements(perm: tuple, possibility: tuple) -> Iterator[Tuple[tuple, tuple]]:
+    """Yields the ring and, unless they are the same, its mirror image. All the other equivalent rings are the same
+    placement traced from another tile or backwards, which doesn't change which tiles fit on it."""
+    yield perm, possibility
+    turns = ring_to_turns(perm, possibility)
+    reversed_turns = turns[::-1]
+    # the reversed sequence is the mirror image traced backwards, started on its smallest turn so that it is valid
+    mirror_turns = min(reversed_turns[shift:] + reversed_turns[:shift] for shift in range(len(turns)))
+    if mirror_turns not in {turns[shift:] + turns[:shift] for shift in range(len(turns))}:
+        yield turns_to_ring(mirror_turns)
+
+
+def ring_path(perm: tuple, possibility: tuple) -> List[Tuple[tuple, int, int]]:
+    """Returns the (position, entry edge, exit edge) of each tile of a ring, the first tile being on (0, 0)."""
+    position = (0, 0)
+    exit_ = perm[0] % 6
+    path = [(position, 0, exit_)]
+    for tile_type, orientation in zip(perm[1:], possibility):
+        offset = POSITION_OFFSET[exit_]
+        position = (position[0] + offset[0], position[1] + offset[1])
+        entry = (exit_ + 3) % 6
+        exit_ = (entry + orientation * tile_type) % 6
+        path.append((position, entry, exit_))
+    return path
+
+
+class RingSearch:
+    """Depth-first search of the closed rings that can be built with a multiset of line types (1, 2 or 3, see
+    TantrixHex.line_types). Tiles are placed one at a time on a single grid. When a placement collapses onto an occupied
+    cell, only that placement is undone, and the whole subtree below the collapsed prefix is skipped.
+
+    The first tile is fixed on the middle of the grid, entering from the NW edge (0) and exiting on the side given by
+    its line type. A ring is closed when the last tile sits on the NW neighbour of the first tile and exits on its SE
+    edge. Each ring is reported as the (perm, possibility) pair used by search_ring_permutations, where possibility
+    holds the orientation of every tile but the first: 1 is the short curve CW, -1 is the long curve CW.
+
+    With prune_distance, a path is abandoned as soon as the closing cell is out of reach of the tiles left, or is
+    reached before the last tile. The number of pruned nodes is kept, per reason, in n_pruned.
+
+    A ring can be traced from any of its tiles and in both directions, and its mirror image uses the same line types.
+    With symmetry, only one representative of those equivalent rings is reported, the one with the smallest turn
+    sequence (see canonical_turns), and equivalent_rings expands it back. Its first tile is then of the smallest line
+    type, and paths whose prefix already makes a rotation of the sequence smaller are pruned.
+
+    With a TranspositionTable, the states from which no ring can be closed are remembered, and pruned when reached again
+    by another path. A state is only stored once all its subtree was explored without any symmetry pruning, as it would
+    otherwise depend on the path leading to it. The table can be shared by the searches of the same ring types.
+
+    The children of a node are always explored in the same order, so the state of the search is given by its frontier,
+    the branch being explored (see get_frontier): a search resumed from it explores exactly the nodes left. With a
+    SearchCheckpoint, the frontier and counters are saved periodically, see checkpoint.py.
+    """
+    def __init__(self, ring_types: list, node_callback: Callable = None, prune_distance: bool = True,
+                 symmetry: bool = True, transpositions: TranspositionTable = None, checkpoint=None):
+        """ring_types[0] is the line type of the first, fixed, tile, unless symmetry is used. node_callback(grid,
+        n_nodes) is called after each successful placement, e.g. to plot the search interactively."""
+        self.ring_types = list(ring_types)
+        self.n_tiles = len(ring_types)
+        self.first_type = min(ring_types) if symmetry else ring_types[0]
+        self.remaining = Counter(ring_types)
+        self.remaining[self.first_type] -= 1
+        self.node_callback = node_callback
+        self.prune_distance = prune_distance
+        self.symmetry = symmetry
+        self.transpositions = transpositions
+        self.checkpoint = checkpoint
+
+        self.grid = SparseHexaGrid()
+        self.closing_cell = (self.grid.mid[0] + POSITION_OFFSET[0][0], self.grid.mid[1] + POSITION_OFFSET[0][1])
+
+        # the ring tiles only differ by their line type and rotation, so we build each of them only once
+        self.ring_tiles = dict()
+        for tile_type, edge_colors in TILES.items():
+            for rotation in range(6):
+                tile = TantrixHex(edge_colors=edge_colors, back_color='y', back_number=1)
+                tile.rotate(rotation)
+                self.ring_tiles[(tile_type, rotation)] = tile
+
+        # state of the current path, one entry per placed tile
+        self.types = []
+        self.orientations = []
+        self.positions = []
+        self.exits = []
+        self.turns = []
+        # length of the smallest period of the turn sequence, so far, to check in O(1) that no rotation is smaller
+        self.periods = []
+        # Zobrist hash of the occupied cells
+        self.zobrist = 0
+
+        self.n_nodes = 0
+        self.n_closed = 0
+        self.n_collapsed = 0
+        self.n_pruned = Counter()
+        # next node of the frontier a resumed search is replaying, None once it is replayed
+        self.resume = None
+
+    def place_first(self):
+        """Place the first tile of the ring on the middle of the grid."""
+        self.grid.place_piece(*self.grid.mid, piece=self.ring_tiles[(self.first_type, 0)])
+        self.types.append(self.first_type)
+        self.positions.append(self.grid.mid)
+        if self.transpositions is not None:
+            self.zobrist ^= self.transpositions.cell_key(self.grid.mid)
+        self.exits.append(self.first_type % 6)
+        self.turns.append(self.first_type - 3)
+        self.periods.append(1)
+
+    def next_position(self) -> tuple:
+        """Position of the cell connected to the exit of the last placed tile."""
+        last_position = self.positions[-1]
+        offset = POSITION_OFFSET[self.exits[-1]]
+        return last_position[0] + offset[0], last_position[1] + offset[1]
+
+    def prune_reason(self) -> [str, None]:
+        """Check whether the ring can still be closed from the current path. Returns the reason why it cannot, or None.
+        The hex distance is a lower bound of the number of tiles needed to reach the closing cell, so no closed ring is
+        ever pruned."""
+        position = self.next_position()
+        tiles_left = self.n_tiles - len(self.types) - 1  # after the next tile
+        if position == self.closing_cell and tiles_left > 0:
+            return 'closing_cell'
+        if hex_distance(position, self.closing_cell) > tiles_left:
+            return 'distance'
+        return None
+
+    def place(self, tile_type: int, orientation: int) -> bool:
+        """Place the next tile of the ring, connected to the exit of the last one. Returns False if the path collapsed,
+        in which case nothing was placed."""
+        last_exit = self.exits[-1]
+        position = self.next_position()
+
+        entry = (last_exit + 3) % 6
+        if orientation == 1:
+            rotation = entry
+            exit_ = (entry + tile_type) % 6
+        else:
+            rotation = (entry - tile_type) % 6
+            exit_ = rotation
+
+        turn = -orientation * (3 - tile_type)
+        if self.symmetry:
+            # the prefix is that of a smallest rotation (a prenecklace) only if each new turn is at least equal to the
+            # one a period earlier. If larger, the whole prefix becomes the new period.
+            period = self.periods[-1]
+            previous_turn = self.turns[len(self.turns) - period]
+            if turn < previous_turn:
+                self.n_pruned['symmetry'] += 1
+                return False
+            if turn > previous_turn:
+                period = len(self.turns) + 1
+        else:
+            period = None
+
+        try:
+            self.grid.place_piece(*position, piece=self.ring_tiles[(tile_type, rotation)])
+        except OccupiedCell:
+            # path collapsed
+            self.n_collapsed += 1
+            return False
+
+        self.n_nodes += 1
+        self.remaining[tile_type] -= 1
+        self.types.append(tile_type)
+        self.orientations.append(orientation)
+        self.positions.append(position)
+        self.exits.append(exit_)
+        self.turns.append(turn)
+        self.periods.append(period)
+        if self.transpositions is not None:
+            self.zobrist ^= self.transpositions.cell_key(position)
+        if self.node_callback is not None:
+            self.node_callback(self.grid, self.n_nodes)
+        if self.checkpoint is not None and not self.n_nodes & CHECKPOINT_NODES_MASK:
+            self.checkpoint.on_node(self)
+        return True
+
+    def undo(self):
+        """Remove the last placed tile of the ring."""
+        self.grid.remove_last_piece()
+        self.remaining[self.types.pop()] += 1
+        self.orientations.pop()
+        if self.transpositions is not None:
+            self.zobrist ^= self.transpositions.cell_key(self.positions[-1])
+        self.positions.pop()
+        self.exits.pop()
+        self.turns.pop()
+        self.periods.pop()
+
+    def is_closed(self) -> bool:
+        """Check whether the last placed tile connects back to the entry of the first one."""
+        return self.positions[-1] == self.closing_cell and self.exits[-1] == 3
+
+    def get_counters(self) -> Counter:
+        """Counters of the search so far, e.g. to merge those of several searches."""
+        counters = Counter(nodes=self.n_nodes, collapsed=self.n_collapsed)
+        for reason, count in self.n_pruned.items():
+            counters[f'pruned_{reason}'] = count
+        return counters
+
+    def set_counters(self, counters: Counter):
+        """Restore the counters of get_counters, e.g. those of a checkpoint."""
+        self.n_nodes = counters['nodes']
+        self.n_collapsed = counters['collapsed']
+        self.n_pruned = Counter({key[len('pruned_'):]: value for key, value in counters.items()
+                                 if key.startswith('pruned_')})
+
+    def get_frontier(self) -> Tree:
+        """The branch being explored, after the first tile. Right after a placement, the subtree of the last node is
+        not explored yet."""
+        return Tree(list(zip(self.types[1:], self.orientations)))
+
+    def iter_rings(self, prefix: List[Tuple[int, int]] = None, resume: Tree = None) -> Iterator[Tuple[tuple, tuple]]:
+        """Yields each closed ring as a (perm, possibility) pair. While a ring is being yielded, self.grid holds its
+        placement. If given, the (tile type, orientation) of the prefix are placed after the first tile, and only the
+        rings starting with it are searched. With a resume frontier, see get_frontier, only the nodes from its last
+        one onwards are explored, as if the search was never stopped: the branch is placed again, but the nodes before
+        it are skipped."""
+        assert prefix is None or resume is None
+        if not self.types:
+            self.place_first()
+        for tile_type, orientation in prefix or []:
+            if not self.place(tile_type, orientation):
+                return
+        if resume is not None and resume.root is not None:
+            self.resume = resume.root
+            # the nodes of the branch are counted again when placed
+            self.n_nodes -= resume.depth
+        yield from self._expand()
+
+    def iter_prefixes(self, n_tiles: int) -> Iterator[List[Tuple[int, int]]]:
+        """Yields the (tile type, orientation) of the tiles placed after the first one, for each path of n_tiles that
+        can still lead to a ring. The rings starting with each of them can then be searched independently."""
+        if not self.types:
+            self.place_first()
+        yield from self._expand_prefixes(n_tiles)
+
+    def _expand_prefixes(self, n_tiles: int) -> Iterator[List[Tuple[int, int]]]:
+        if len(self.types) == n_tiles:
+            yield list(zip(self.types[1:], self.orientations))
+            return
+        for __ in self._place_children():
+            yield from self._expand_prefixes(n_tiles)
+
+    def _expand(self) -> Iterator[Tuple[tuple, tuple]]:
+        if len(self.types) == self.n_tiles:
+            if self.is_closed():
+                self.n_closed += 1
+                if self.symmetry and canonical_turns(tuple(self.turns)) != tuple(self.turns):
+                    self.n_pruned['symmetry'] += 1
+                    return
+                yield tuple(self.types), tuple(self.orientations)
+            return
+
+        if self.transpositions is None:
+            for __ in self._place_children():
+                yield from self._expand()
+            return
+
+        state = (self.zobrist, self.positions[-1], self.exits[-1],
+                 self.remaining[1], self.remaining[2], self.remaining[3])
+        if self.transpositions.lookup(state) is False:
+            self.n_pruned['transposition'] += 1
+            # nothing is left to resume below
+            self.resume = None
+            return
+        # the subtree of a node of a resumed branch was partly explored before it was stopped
+        resumed = self.resume is not None
+        n_closed, n_pruned_symmetry = self.n_closed, self.n_pruned['symmetry']
+        for __ in self._place_children():
+            yield from self._expand()
+        # only reached once the whole subtree was explored
+        if self.n_pruned['symmetry'] == n_pruned_symmetry and not resumed:
+            self.transpositions.store(state, closes=self.n_closed > n_closed)
+
+    def _place_children(self) -> Iterator[None]:
+        """Place each possible next tile in turn, yielding while it is placed."""
+        if self.prune_distance:
+            reason = self.prune_reason()
+            if reason is not None:
+                self.n_pruned[reason] += 1
+                self.resume = None
+                return
+
+        resume = self.resume
+        if resume is not None:
+            self.resume = resume.pos or resume.neg
+        for tile_type in (1, 2, 3):
+            if not self.remaining[tile_type]:
+                continue
+            # both orientations of a straight line lead to the same path
+            for orientation in ((1, ) if tile_type == 3 else (-1, 1)):
+                if resume is not None:
+                    # the children before the resumed one were explored before the search was stopped
+                    if tile_type != resume.rotation or orientation != resume.orientation:
+                        continue
+                    resume = None
+                if not self.place(tile_type, orientation):
+                    continue
+                yield
+                self.undo()
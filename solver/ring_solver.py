@@ -0,0 +1,141 @@
+import threading
+from typing import Callable, Iterator, Tuple
+
+from solver.checkpoint import SearchCheckpoint
+from solver.hexagrid import HexaGrid, SparseHexaGrid
+from solver.parallel_solver import parallel_solve
+from solver.ring_library import RingLibrary, composition, get_default_library, get_ring_types
+from solver.ring_search import RingSearch
+from solver.search_stats import SearchStats
+from solver.tile_matching import iter_ring_matches, match_rings, place_solution
+from solver.transposition import TranspositionTable
+
+
+def get_request_key(pieces: list, color: str) -> Tuple[tuple, str]:
+    """Canonical form of a puzzle: the sorted edge colors of its tiles, which doesn't depend on their order nor on
+    their rotation, and the color of the ring."""
+    return tuple(sorted(tile.original_edge_colors for tile in pieces)), color
+
+
+def find_solution(pieces: list, color: str, library: RingLibrary = None, parallel: bool = False, workers: int = None,
+                  node_callback: Callable = None, progress: bool = False, transpositions: TranspositionTable = None,
+                  stats_callback: Callable = None, stats_interval: int = 10_000, validate: bool = True,
+                  profiler: str = None, checkpoint: str = None,
+                  checkpoint_interval: float = 60.) -> Tuple[[list, None], SearchStats]:
+    """Search a ring of the given color with all the pieces, and fit the pieces on it, without plotting or printing
+    anything. The ring shapes are looked up in the library (by default the one in the resources folder, see
+    ring_library.py) when their composition was enumerated, and searched otherwise. With parallel, the search is split
+    across a pool of worker processes (see parallel_solver.py). A TranspositionTable can be shared by the sequential
+    searches of pieces with the same line types, see RingSearch. node_callback, transpositions and stats_callback are
+    only supported by the sequential search.
+    stats_callback(stats) is called every stats_interval nodes of a sequential search, with the SearchStats so far. With
+    a profiler ('cprofile' or 'pyinstrument'), the solve is profiled, only in the main process if parallel.
+    With a checkpoint filepath, a sequential ring search is saved there every checkpoint_interval seconds, and resumed
+    from it if it exists, see checkpoint.py. The rings of the library are not checkpointed, they are quickly listed.
+    Returns the solution, as in search_ring_permutations, or None, and the SearchStats of the solve."""
+    assert len(color) == 1 and color in 'rbyg'
+    assert checkpoint is None or not parallel, "Only the sequential search can be checkpointed"
+    assert not parallel or node_callback is None and stats_callback is None and transpositions is None, \
+        "The callbacks and the TranspositionTable are only used by the sequential search"
+    stats = SearchStats()
+    n_allocations = HexaGrid.n_allocations
+    with stats.profile(profiler):
+        if library is None:
+            library = get_default_library()
+        if parallel:
+            solution, worker_stats = parallel_solve(pieces, color, workers=workers, library=library,
+                                                    progress=progress)
+            stats.merge(worker_stats)
+        else:
+            if checkpoint is not None:
+                checkpoint = SearchCheckpoint(checkpoint, interval=checkpoint_interval, stats=stats,
+                                              puzzle=get_request_key(pieces, color))
+            solution = _find_solution(pieces, color, library, stats, node_callback, transpositions, stats_callback,
+                                      stats_interval, checkpoint)
+
+        if solution is not None and validate:
+            with stats.timer('validation'):
+                grid = SparseHexaGrid()
+                place_solution(solution, grid)
+                valid, mismatches = grid.is_grid_valid()
+            assert valid, f"The solution has mismatching edges: {mismatches}"
+    stats.counters['grid_allocations'] += HexaGrid.n_allocations - n_allocations
+    return solution, stats
+
+
+def _find_solution(pieces: list, color: str, library: RingLibrary, stats: SearchStats, node_callback: Callable,
+                   transpositions: TranspositionTable, stats_callback: Callable, stats_interval: int,
+                   checkpoint: SearchCheckpoint = None) -> [list, None]:
+    search = None
+
+    def on_node(grid: HexaGrid, n_nodes: int):
+        if node_callback is not None:
+            node_callback(grid, n_nodes)
+        if n_nodes % stats_interval == 0:
+            stats.set_counters(search.get_counters())
+            stats_callback(stats)
+
+    rings, search = _get_rings(pieces, color, library, transpositions,
+                               on_node if stats_callback is not None else node_callback, checkpoint)
+    # FIXME: non-connex solution isn't valid
+    solution = match_rings(pieces, rings, color, stats)
+    if search is not None:
+        stats.set_counters(search.get_counters())
+        if checkpoint is not None and solution is None:
+            # the last checkpoint of a solved search is kept, a resumed one finds the solution again
+            checkpoint.save(search, finished=True)
+    return solution
+
+
+def _get_rings(pieces: list, color: str, library: RingLibrary, transpositions: TranspositionTable,
+               node_callback: Callable, checkpoint: SearchCheckpoint = None
+               ) -> Tuple[Iterator[Tuple[tuple, tuple]], [RingSearch, None]]:
+    """The rings of the pieces, lazily, from the library if their composition is in it, or else from a RingSearch,
+    returned along with them. The search is resumed from the checkpoint, if given and saved. There is no ring if the
+    pieces can't form any, see get_ring_types."""
+    ring_types = get_ring_types(pieces, color)
+    if ring_types is None:
+        return iter(()), None
+    key = composition(ring_types)
+    if key in library:
+        return library.iter_rings(key), None
+    search = RingSearch(ring_types, transpositions=transpositions, node_callback=node_callback, checkpoint=checkpoint)
+    frontier = None if checkpoint is None else checkpoint.load(search)
+    if checkpoint is not None and checkpoint.finished:
+        return iter(()), search
+    return search.iter_rings(resume=frontier), search
+
+
+def iter_solutions(pieces: list, color: str, library: RingLibrary = None, transpositions: TranspositionTable = None,
+                   stats: SearchStats = None, cancel: threading.Event = None) -> Iterator[Tuple[str, object]]:
+    """Yields as soon as they are found every ring of the given color with all the pieces, as ('ring', (perm,
+    possibility)), each followed by the distinct solutions fitting the pieces on it, as ('solution', solution), see
+    iter_ring_matches. Nothing is kept of the rings and solutions already yielded, so the memory doesn't grow with them.
+    To stop early, close the generator, e.g. by breaking out of the loop, or set cancel, e.g. from another thread: it is
+    checked between two rings and between two solutions. The counters and timings are added to stats, if given."""
+    assert len(color) == 1 and color in 'rbyg'
+    if library is None:
+        library = get_default_library()
+    if stats is None:
+        stats = SearchStats()
+    rings, search = _get_rings(pieces, color, library, transpositions, None)
+    try:
+        while cancel is None or not cancel.is_set():
+            with stats.timer('ring_search'):
+                ring = next(rings, None)
+            if ring is None:
+                return
+            stats.counters['rings'] += 1
+            yield 'ring', ring
+
+            solutions = iter_ring_matches(pieces, *ring, color)
+            while cancel is None or not cancel.is_set():
+                with stats.timer('color_matching'):
+                    solution = next(solutions, None)
+                if solution is None:
+                    break
+                stats.counters['solutions'] += 1
+                yield 'solution', solution
+    finally:
+        if search is not None:
+            stats.set_counters(search.get_counters())
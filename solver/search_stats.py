@@ -0,0 +1,82 @@
+import io
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+PHASES = ('ring_search', 'color_matching', 'validation')
+
+
+class SearchStats:
+    """Counters and timings of a solve. The counters are those of RingSearch.get_counters (nodes, collapsed, pruned_*
+    per reason), plus the number of rings tried and of grids allocated. The timings split the time between the PHASES.
+    Indexing a SearchStats returns a counter, 0 if it was never set."""
+    def __init__(self):
+        self.counters = Counter()
+        self.timings = Counter()
+        self.profile_report = None
+
+    def __getitem__(self, key: str) -> int:
+        return self.counters[key]
+
+    def __repr__(self):
+        return f"SearchStats({self.as_dict()})"
+
+    def set_counters(self, counters: Counter):
+        """Overwrite some counters with their latest value, e.g. those of a running search."""
+        for key, value in counters.items():
+            self.counters[key] = value
+
+    def merge(self, other: 'SearchStats'):
+        """Add the counters and timings of another solve, e.g. of a worker."""
+        self.counters.update(other.counters)
+        self.timings.update(other.timings)
+
+    def get_pruned(self) -> dict:
+        """Number of pruned nodes, per reason."""
+        return {key[len('pruned_'):]: value for key, value in self.counters.items() if key.startswith('pruned_')}
+
+    @contextmanager
+    def timer(self, phase: str):
+        """Add the time spent in the context to a phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[phase] += time.perf_counter() - start
+
+    @contextmanager
+    def profile(self, profiler: str = None):
+        """Profile the context with 'cprofile' or 'pyinstrument', if given, and keep the text report in
+        profile_report. pyinstrument is optional, and only imported here."""
+        if profiler is None:
+            yield
+        elif profiler == 'cprofile':
+            import cProfile
+            import pstats
+
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                report = io.StringIO()
+                pstats.Stats(profile, stream=report).sort_stats('cumulative').print_stats(30)
+                self.profile_report = report.getvalue()
+        elif profiler == 'pyinstrument':
+            from pyinstrument import Profiler
+
+            profile = Profiler()
+            profile.start()
+            try:
+                yield
+            finally:
+                profile.stop()
+                self.profile_report = profile.output_text()
+        else:
+            raise ValueError(f"Unknown profiler: {profiler}")
+
+    def as_dict(self) -> dict:
+        return dict(counters=dict(self.counters), pruned=self.get_pruned(),
+                    timings={phase: round(self.timings[phase], 6) for phase in PHASES})
@@ -0,0 +1,197 @@
+"""Asyncio front-end of the solver, e.g. for a web backend. Each solve runs in its own worker process, so that a solve
+that times out or gets cancelled is actually stopped, and at most `workers` of them run at the same time. Concurrent
+requests for the same tiles and color share a single solve, and the results are kept in an LRU cache.
+
+    async with SolveService(workers=4) as service:
+        solution, stats = await service.solve(pieces, 'y', timeout=10)
+
+It can also be run as a local server, answering JSON lines requests such as {"tiles": [1, 2, 3], "color": "r"} with
+records like those of batch_solver.py:
+
+    python -m solver.solve_service --port 8765 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from solver.ring_solver import find_solution, get_request_key
+from solver.search_stats import SearchStats
+
+
+def _solve_in_process(pieces: list, color: str, connection):
+    """Target of a worker process. Sends back the solution, with each tile given by its edge colors, and the stats."""
+    try:
+        solution, stats = find_solution(pieces, color)
+    except Exception as e:
+        connection.send(('error', repr(e), None))
+        return
+    if solution is not None:
+        solution = [(tile.original_edge_colors, rotation, position) for tile, rotation, position in solution]
+    connection.send(('done', solution, stats))
+
+
+class SolveService:
+    """Solves puzzles in worker processes, see the module docstring. A request is identified by get_request_key, and
+    its result, the solution and the SearchStats of its solve, is cached whether a solution was found or not. Errors,
+    timeouts and cancellations are not cached."""
+    def __init__(self, workers: int = None, cache_size: int = 1024, timeout: float = None):
+        """timeout is the default time limit of a request, in seconds, None for no limit."""
+        self.workers = workers or multiprocessing.cpu_count()
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.cache = OrderedDict()
+        self.in_flight: Dict[tuple, asyncio.Task] = dict()
+        self.n_waiters: Dict[asyncio.Task, int] = dict()
+        self.semaphore = None
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def __aenter__(self) -> 'SolveService':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Cancel the solves in flight, and stop their worker processes."""
+        tasks = list(self.in_flight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def solve(self, pieces: list, color: str, timeout: float = None) -> Tuple[[list, None], SearchStats]:
+        """Solution of the pieces with a ring of the given color, as find_solution, with the tiles of pieces. Raises
+        asyncio.TimeoutError after timeout seconds, by default the timeout of the service. Cancelling the request, or
+        its time out, only stops the solve if no other request is waiting for it."""
+        key = get_request_key(pieces, color)
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self._decode(self.cache[key], pieces)
+
+        task = self.in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            task = self.in_flight[key] = asyncio.ensure_future(self._run(key, pieces, color))
+        else:
+            self.coalesced += 1
+        self.n_waiters[task] = self.n_waiters.get(task, 0) + 1
+        try:
+            result = await asyncio.wait_for(asyncio.shield(task), self.timeout if timeout is None else timeout)
+        finally:
+            self.n_waiters[task] -= 1
+            if not self.n_waiters[task]:
+                del self.n_waiters[task]
+                # the last request waiting for a solve stops it, e.g. when it timed out
+                if not task.done():
+                    task.cancel()
+        return self._decode(result, pieces)
+
+    async def _run(self, key: tuple, pieces: list, color: str) -> tuple:
+        """Solve in a worker process, once one is available, and cache the result."""
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.workers)
+        try:
+            async with self.semaphore:
+                result = await self._run_process(pieces, color)
+        finally:
+            del self.in_flight[key]
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    async def _run_process(pieces: list, color: str) -> tuple:
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=_solve_in_process, args=(pieces, color, sender), daemon=True)
+        process.start()
+        sender.close()
+        try:
+            # the blocking wait happens in a thread, and returns as soon as the process ends, whatever the reason
+            await asyncio.get_running_loop().run_in_executor(None, receiver.poll, None)
+            try:
+                status, solution, stats = receiver.recv()
+            except EOFError:
+                raise RuntimeError(f"The worker process stopped with exit code {process.exitcode}") from None
+        finally:
+            process.terminate()
+            process.join()
+        if status == 'error':
+            raise RuntimeError(solution)
+        return solution, stats
+
+    @staticmethod
+    def _decode(result: tuple, pieces: list) -> Tuple[[list, None], SearchStats]:
+        """The cached solution with the given tiles, which may be other objects than those of the solve."""
+        solution, stats = result
+        if solution is None:
+            return None, stats
+        tiles = {tile.original_edge_colors: tile for tile in pieces}
+        return [(tiles[edge_colors], rotation, position) for edge_colors, rotation, position in solution], stats
+
+    def get_stats(self) -> dict:
+        requests = self.hits + self.misses + self.coalesced
+        return dict(cache_size=len(self.cache), in_flight=len(self.in_flight), hits=self.hits, misses=self.misses,
+                    coalesced=self.coalesced, hit_rate=self.hits / requests if requests else 0.)
+
+
+async def _handle_client(service: SolveService, pieces: list, reader: asyncio.StreamReader,
+                         writer: asyncio.StreamWriter):
+    """Answers the JSON lines requests of a client, in order."""
+    tiles_by_number = {tile.back_number: tile for tile in pieces}
+    try:
+        while line := await reader.readline():
+            record = dict()
+            try:
+                request = json.loads(line)
+                tiles = [tiles_by_number[number] for number in request['tiles']]
+                color = request.get('color') or tiles[-1].back_color
+                record.update(tiles=request['tiles'], color=color)
+                solution, stats = await service.solve(tiles, color, timeout=request.get('timeout'))
+            except asyncio.TimeoutError:
+                record['status'] = 'timeout'
+            except Exception as e:
+                record.update(status='error', error=repr(e))
+            else:
+                record.update(status='solved' if solution else 'no_solution', stats=stats.as_dict(),
+                              placements=None if solution is None else
+                              [dict(tile=tile.back_number, rotation=rotation, x=position[0], y=position[1])
+                               for tile, rotation, position in solution])
+            writer.write((json.dumps(record) + '\n').encode())
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(host: str = '127.0.0.1', port: int = 8765, workers: int = None, cache_size: int = 1024,
+                timeout: float = None):
+    """Runs a SolveService behind a local TCP server, until cancelled."""
+    from resources.data_loader import populate_tantrix_hexagons
+
+    pieces = populate_tantrix_hexagons()
+    async with SolveService(workers=workers, cache_size=cache_size, timeout=timeout) as service:
+        server = await asyncio.start_server(lambda reader, writer: _handle_client(service, pieces, reader, writer),
+                                            host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Serve Tantrix solves as JSON lines over a local TCP socket.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, help="maximum number of concurrent solves, by default the CPU count")
+    parser.add_argument('--cache-size', type=int, default=1024, help="number of results kept")
+    parser.add_argument('--timeout', type=float, help="default time limit of a request, in seconds")
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.host, args.port, args.workers, args.cache_size, args.timeout))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""Survey of the solvability of many tile subsets, without any plotting nor printing. For instance, whether each subset
+of 5 and 6 tiles among the first 15 of the catalogue forms a ring of the back color of its last tile, and with how many
+distinct solutions:
+
+    python -m solver.survey --sizes 5 6 --tiles 15 --output survey_5_6
+
+The subsets are generated lazily, and solved in chunks by a pool of worker processes. Each idle worker takes the next
+chunk, so that a hard subset only keeps its own worker busy, and only a few chunks per worker are queued at a time, so
+the memory doesn't depend on the number of subsets.
+The ring shapes only depend on the composition of the line types (see ring_library.py), so each worker keeps the rings
+of every composition it fully searched, on top of the ring library, and the subsets of the same composition only fit
+their tiles on them. When the solutions are not counted, the rings of a new composition are searched lazily, only until
+one of them fits the tiles. The line types of each tile are computed once, to skip the subsets with a tile without the
+ring color.
+
+The records are written as they come, in batches, each one to its own Parquet file of the output folder, which can be
+read at any time with pandas.read_parquet. pyarrow is only needed, and imported, to write them.
+"""
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Tuple
+
+from resources.data_loader import populate_tantrix_hexagons
+from solver.ring_library import RING_LIBRARY_PATH, RingLibrary, composition
+from solver.ring_search import RingSearch
+from solver.tile_matching import iter_ring_matches, match_ring
+
+
+SURVEY_FIELDS = ['subset', 'tiles', 'n_tiles', 'color', 'status', 'n_rings', 'n_solutions', 'time', 'error']
+
+# state shared by all the jobs of a worker process, set once when the pool starts
+_worker_state = dict()
+
+
+def iter_subsets(pieces: list, sizes: List[int], colors: str = None) -> Iterator[Tuple[int, tuple, str]]:
+    """Yields each (index, tile indices, color) job of the survey, lazily: every subset of each size, in lexicographic
+    order, with each of the colors, or else with the back color of its last tile."""
+    index = 0
+    for size in sizes:
+        assert 3 <= size <= len(pieces)
+        for subset in itertools.combinations(range(len(pieces)), size):
+            for color in colors or pieces[subset[-1]].back_color:
+                yield index, subset, color
+                index += 1
+
+
+def _init_worker(pieces: list, library_path: str):
+    _worker_state.update(pieces=pieces, library=RingLibrary(library_path), rings=dict())
+
+
+def _iter_rings(ring_types: list) -> Iterator[Tuple[tuple, tuple]]:
+    """Yields the rings of a composition, from those kept by the worker or the library, or else searched lazily. The
+    rings searched are only kept for the next subsets once all of them were yielded."""
+    key = composition(ring_types)
+    rings = _worker_state['rings'].get(key)
+    if rings is None and key in _worker_state['library']:
+        rings = _worker_state['rings'][key] = list(_worker_state['library'].iter_rings(key))
+    if rings is not None:
+        yield from rings
+        return
+    rings = []
+    for ring in RingSearch(ring_types).iter_rings():
+        rings.append(ring)
+        yield ring
+    _worker_state['rings'][key] = rings
+
+
+def _survey_subset(subset: tuple, color: str, count_solutions: bool) -> dict:
+    tiles = [_worker_state['pieces'][tile_idx] for tile_idx in subset]
+    rings = _iter_rings([tile.line_types.get(color) for tile in tiles])
+    n_rings = 0
+    if not count_solutions:
+        for ring in rings:
+            n_rings += 1
+            if match_ring(tiles, *ring, color) is not None:
+                return dict(status='solved', n_rings=n_rings)
+        return dict(status='no_solution', n_rings=n_rings)
+    n_solutions = 0
+    for ring in rings:
+        n_rings += 1
+        n_solutions += sum(1 for __ in iter_ring_matches(tiles, *ring, color))
+    return dict(status='solved' if n_solutions else 'no_solution', n_rings=n_rings, n_solutions=n_solutions)
+
+
+def _survey_chunk(jobs: List[Tuple[int, tuple, str]], count_solutions: bool) -> List[dict]:
+    """Job of a worker: the records of a chunk of subsets."""
+    records = []
+    for index, subset, color in jobs:
+        start = time.perf_counter()
+        try:
+            record = _survey_subset(subset, color, count_solutions)
+        except Exception as e:
+            record = dict(status='error', error=repr(e))
+        records.append(dict(record, subset=index, color=color, time=round(time.perf_counter() - start, 6)))
+    return records
+
+
+def run_survey(pieces: list, jobs: Iterator[Tuple[int, tuple, str]], workers: int = None, chunk_size: int = 16,
+               count_solutions: bool = True, library_path: str = RING_LIBRARY_PATH) -> Iterator[dict]:
+    """Yields the record of each job, see iter_subsets, as soon as it is done, i.e. not in order. The record of a subset
+    with a tile without any line of its color is made here, without any job. Else, the subset is either solved or not,
+    with its number of distinct solutions if count_solutions (see iter_ring_matches), and its number of ring shapes.
+    Without count_solutions, n_rings is the number of rings tried until the first one fitting the tiles."""
+    workers = workers or os.cpu_count()
+    # the line types of each tile, in each color
+    line_types = {color: [tile.line_types.get(color) for tile in pieces] for color in 'rbyg'}
+
+    def complete(record: dict) -> dict:
+        subset = subsets.pop(record['subset'])
+        return dict({field: None for field in SURVEY_FIELDS}, **record,
+                    tiles=[pieces[tile_idx].back_number for tile_idx in subset], n_tiles=len(subset))
+
+    subsets: Dict[int, tuple] = dict()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(pieces, library_path)) as executor:
+        pending = set()
+        chunk = []
+        for index, subset, color in jobs:
+            subsets[index] = subset
+            if not all(line_types[color][tile_idx] for tile_idx in subset):
+                yield complete(dict(subset=index, color=color, status='no_line', n_rings=0, n_solutions=0, time=0.))
+                continue
+            chunk.append((index, subset, color))
+            if len(chunk) < chunk_size:
+                continue
+            pending.add(executor.submit(_survey_chunk, chunk, count_solutions))
+            chunk = []
+            # a few chunks per worker are queued, so that none of them waits, but the subsets are not all generated
+            if len(pending) >= 4 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from map(complete, future.result())
+        if chunk:
+            pending.add(executor.submit(_survey_chunk, chunk, count_solutions))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from map(complete, future.result())
+
+
+class ParquetBatchWriter:
+    """Writes the survey records in batches of batch_size, each one to its own Parquet file of a folder, so that the
+    records written so far can be read while the survey is still running, and are kept if it is stopped."""
+    def __init__(self, folder: str, batch_size: int = 10_000):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.folder = folder
+        self.batch_size = batch_size
+        self.schema = pa.schema([('subset', pa.int64()), ('tiles', pa.list_(pa.int16())), ('n_tiles', pa.int16()),
+                                 ('color', pa.string()), ('status', pa.string()), ('n_rings', pa.int32()),
+                                 ('n_solutions', pa.int64()), ('time', pa.float64()), ('error', pa.string())])
+        self.records = []
+        self.n_files = 0
+        self.n_records = 0
+        os.makedirs(folder, exist_ok=True)
+
+    def __enter__(self) -> 'ParquetBatchWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def write(self, record: dict):
+        self.records.append(record)
+        if len(self.records) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.records:
+            return
+        import pyarrow.parquet as pq
+
+        table = self.pa.Table.from_pylist(self.records, schema=self.schema)
+        filename = f'part-{self.n_files:05d}.parquet'
+        # write to a hidden temporary file first, ignored by the readers, so that a stopped survey never leaves a
+        # truncated file
+        tmp_filepath = os.path.join(self.folder, f'.{filename}.tmp')
+        pq.write_table(table, tmp_filepath)
+        os.replace(tmp_filepath, os.path.join(self.folder, filename))
+        self.n_files += 1
+        self.n_records += len(self.records)
+        self.records = []
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Survey the solvability of the subsets of Tantrix tiles.")
+    parser.add_argument('--sizes', type=int, nargs='+', required=True, help="sizes of the subsets")
+    parser.add_argument('--tiles', type=int, help="only use the first tiles of the catalogue, by default all of them")
+    parser.add_argument('--colors', help="colors of the rings, e.g. 'rby', by default the back color of the last tile "
+                                         "of each subset")
+    parser.add_argument('--workers', type=int, help="worker processes, by default the CPU count")
+    parser.add_argument('--chunk-size', type=int, default=16, help="subsets per job")
+    parser.add_argument('--batch-size', type=int, default=10_000, help="records per Parquet file")
+    parser.add_argument('--no-count', action='store_true', help="only check whether each subset has a solution")
+    parser.add_argument('--output', required=True, help="output folder")
+    args = parser.parse_args(argv)
+
+    pieces = populate_tantrix_hexagons()[:args.tiles]
+    jobs = iter_subsets(pieces, args.sizes, args.colors)
+    start = time.perf_counter()
+    with ParquetBatchWriter(args.output, args.batch_size) as writer:
+        for record in run_survey(pieces, jobs, workers=args.workers, chunk_size=args.chunk_size,
+                                 count_solutions=not args.no_count):
+            writer.write(record)
+    print(f"{writer.n_records} records written in {writer.n_files} files, in {time.perf_counter() - start:.1f}s.")
+
+
+if __name__ == '__main__':
+    main()
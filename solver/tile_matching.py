@@ -0,0 +1,191 @@
+from typing import Iterable, Iterator, List, Tuple
+
+from resources.hexagon import CODE_BITS, CODE_MASK, COLOR_CODES
+from solver.hexagrid import POSITION_OFFSET, HexaGrid
+from solver.ring_search import distinct_placements, ring_path, ring_to_turns
+from solver.search_stats import SearchStats
+
+
+def iter_ring_permutations(tiles: list, tiles_order: tuple, tile_orientation: tuple,
+                           ring_color: str) -> Iterator[list]:
+    """Once we defined a working anneal, we need to find the right sequence of pieces so that not only the main color
+    works, but also all the other lines.
+
+    This is solved as a constraint satisfaction problem: each cell of the ring gets a domain of (tile, rotation) values
+    whose ring_color line follows the anneal, and adjacent cells must have the same color on their shared edge. Domains
+    are first made arc consistent, then values are assigned with forward checking, the smallest domain first.
+    Yields every solution, lazily, as a list of (tile, rotation, position) for each cell of the ring, the first one
+    being on (0, 0)."""
+    assert ring_color in 'rgby'
+    assert len(tiles) == len(tiles_order) == len(tile_orientation) + 1
+
+    path = ring_path(tiles_order, tile_orientation)
+    cell_indices = {position: idx for idx, (position, __, __) in enumerate(path)}
+
+    # the values are (tile index, rotation, packed edge colors), see pack_edge_colors, so that the colors of the edges
+    # are compared as integers
+    ring_code = COLOR_CODES[ring_color]
+    domains = []
+    for (__, entry, exit_), tile_type in zip(path, tiles_order):
+        domain = []
+        for tile_idx, tile in enumerate(tiles):
+            if tile.line_types.get(ring_color) != tile_type:
+                continue
+            for rotation in range(6):
+                codes = tile.get_rotated_codes(rotation)
+                if codes >> CODE_BITS * entry & CODE_MASK == ring_code and \
+                        codes >> CODE_BITS * exit_ & CODE_MASK == ring_code:
+                    domain.append((tile_idx, rotation, codes))
+        domains.append(domain)
+
+    # for each cell, the adjacent cells of the ring and the edge they share
+    neighbours = []
+    for position, __, __ in path:
+        cell_neighbours = []
+        for edge, offset in POSITION_OFFSET.items():
+            neighbour_idx = cell_indices.get((position[0] + offset[0], position[1] + offset[1]))
+            if neighbour_idx is not None:
+                cell_neighbours.append((neighbour_idx, edge))
+        neighbours.append(cell_neighbours)
+
+    if not _make_arc_consistent(domains, neighbours):
+        return
+    for assignment in _iter_assignments(domains, neighbours, tiles_order, dict()):
+        yield [(tiles[assignment[idx][0]], assignment[idx][1], path[idx][0]) for idx in range(len(path))]
+
+
+def search_ring_permutations(tiles: list, tiles_order: tuple, tile_orientation: tuple, ring_color: str) -> [list, None]:
+    """The first solution of iter_ring_permutations, or None if the tiles can't fit on the anneal."""
+    return next(iter_ring_permutations(tiles, tiles_order, tile_orientation, ring_color), None)
+
+
+def match_ring(tiles: list, perm: tuple, possibility: tuple, ring_color: str) -> [list, None]:
+    """Fit the tiles on a ring found by a RingSearch, or on its mirror image, see search_ring_permutations. The rings
+    are only reported once per symmetry class, and the mirror image is the only other placement that matters."""
+    for ring_perm, ring_possibility in distinct_placements(perm, possibility):
+        solution = search_ring_permutations(tiles, ring_perm, ring_possibility, ring_color)
+        if solution is not None:
+            return solution
+    return None
+
+
+def iter_ring_matches(tiles: list, perm: tuple, possibility: tuple, ring_color: str) -> Iterator[list]:
+    """Yields every distinct way to fit the tiles on a ring, and on its mirror image, see match_ring. When the ring
+    can be rotated onto itself, the solutions that are the same once rotated are only yielded once."""
+    for ring_perm, ring_possibility in distinct_placements(perm, possibility):
+        path = ring_path(ring_perm, ring_possibility)
+        symmetries = _ring_symmetries(ring_to_turns(ring_perm, ring_possibility))
+        for solution in iter_ring_permutations(tiles, ring_perm, ring_possibility, ring_color):
+            if _is_canonical_solution(tiles, solution, path, symmetries):
+                yield solution
+
+
+def _ring_symmetries(turns: tuple) -> List[Tuple[int, bool]]:
+    """The (shift, reverse) transforms of a turn sequence, see _ring_transforms, that leave it unchanged, i.e. the
+    rotations of the grid mapping the ring onto itself. Mirror images are left out, as the tiles can't be flipped."""
+    reversed_turns = tuple(-turn for turn in turns[::-1])
+    return [(shift, reverse) for reverse, sequence in ((False, turns), (True, reversed_turns))
+            for shift in range(len(turns)) if sequence[shift:] + sequence[:shift] == turns]
+
+
+def _is_canonical_solution(tiles: list, solution: list, path: list, symmetries: List[Tuple[int, bool]]) -> bool:
+    """Whether a solution is the smallest of its images by the symmetries of its ring. Each cell is described by its
+    tile and its edge colors read clockwise from where the ring enters it, which doesn't depend on the rotation of the
+    grid, so that the images are compared without placing them."""
+    if len(symmetries) == 1:
+        return True
+    forward = []
+    backward = []
+    for (tile, rotation, __), (__, entry, exit_) in zip(solution, path):
+        edge_colors = tile.get_rotated_edge_colors(rotation)
+        tile_idx = tiles.index(tile)
+        forward.append((tile_idx, edge_colors[entry:] + edge_colors[:entry]))
+        backward.append((tile_idx, edge_colors[exit_:] + edge_colors[:exit_]))
+    backward.reverse()
+    for shift, reverse in symmetries:
+        sequence = backward if reverse else forward
+        if sequence[shift:] + sequence[:shift] < forward:
+            return False
+    return True
+
+
+def match_rings(tiles: list, rings: Iterable[Tuple[tuple, tuple]], ring_color: str, stats: SearchStats) -> [list, None]:
+    """Fit the tiles on each ring in turn, see match_ring, until they fit on one of them. The time spent producing the
+    rings, e.g. by a RingSearch, and fitting the tiles is added to the stats, along with the number of rings tried."""
+    rings = iter(rings)
+    while True:
+        with stats.timer('ring_search'):
+            ring = next(rings, None)
+        if ring is None:
+            return None
+        stats.counters['rings'] += 1
+        with stats.timer('color_matching'):
+            solution = match_ring(tiles, *ring, ring_color)
+        if solution is not None:
+            return solution
+
+
+def place_solution(solution: list, grid: HexaGrid):
+    """Rotate the tiles of a solution, and place them on a grid, the first one in the middle."""
+    for tile, rotation, position in solution:
+        tile.reset_rotation()
+        tile.rotate(rotation)
+        grid.place_piece(grid.mid[0] + position[0], grid.mid[1] + position[1], piece=tile)
+
+
+def _make_arc_consistent(domains: list, neighbours: list) -> bool:
+    """AC-3: remove the values that have no matching value in an adjacent cell, until nothing changes. Returns False if
+    a domain got empty."""
+    queue = [(idx, neighbour_idx, edge) for idx, cell_neighbours in enumerate(neighbours)
+             for neighbour_idx, edge in cell_neighbours]
+    while queue:
+        idx, neighbour_idx, edge = queue.pop()
+        shift, opposite_shift = CODE_BITS * edge, CODE_BITS * ((edge + 3) % 6)
+        neighbour_colors = {value[2] >> opposite_shift & CODE_MASK for value in domains[neighbour_idx]}
+        domain = [value for value in domains[idx] if value[2] >> shift & CODE_MASK in neighbour_colors]
+        if len(domain) < len(domains[idx]):
+            if not domain:
+                return False
+            domains[idx] = domain
+            queue.extend((other_idx, idx, (other_edge + 3) % 6) for other_idx, other_edge in neighbours[idx]
+                         if other_idx != neighbour_idx)
+    return True
+
+
+def _iter_assignments(domains: list, neighbours: list, tiles_order: tuple, assignment: dict) -> Iterator[dict]:
+    """Backtracking with forward checking, yielding every complete assignment. Each assigned value is removed from the
+    domains of the cells with the same line type, and restricts the domains of the adjacent cells to the matching
+    colors."""
+    if len(assignment) == len(domains):
+        yield assignment
+        return
+
+    idx = min((k for k in range(len(domains)) if k not in assignment), key=lambda k: len(domains[k]))
+    for value in domains[idx]:
+        new_domains = list(domains)
+        new_domains[idx] = [value]
+        consistent = True
+        # the same tile can't be used twice
+        for other_idx, tile_type in enumerate(tiles_order):
+            if other_idx != idx and other_idx not in assignment and tile_type == tiles_order[idx]:
+                new_domains[other_idx] = [v for v in new_domains[other_idx] if v[0] != value[0]]
+                if not new_domains[other_idx]:
+                    consistent = False
+                    break
+        if not consistent:
+            continue
+        # the shared edges must have the same color
+        for neighbour_idx, edge in neighbours[idx]:
+            if neighbour_idx in assignment:
+                continue
+            color = value[2] >> CODE_BITS * edge & CODE_MASK
+            opposite_shift = CODE_BITS * ((edge + 3) % 6)
+            new_domains[neighbour_idx] = [v for v in new_domains[neighbour_idx]
+                                          if v[2] >> opposite_shift & CODE_MASK == color]
+            if not new_domains[neighbour_idx]:
+                consistent = False
+                break
+        if not consistent:
+            continue
+
+        yield from _iter_assignments(new_domains, neighbours, tiles_order, {**assignment, idx: value})
@@ -0,0 +1,51 @@
+import random
+from collections import OrderedDict
+from typing import Dict
+
+
+class TranspositionTable:
+    """Results of partial ring states already explored by a RingSearch, so that a state reached again through another
+    permutation of the tiles is answered without exploring it again.
+
+    A state is the set of occupied cells, the position and exit of the last tile, and the count of each line type left.
+    The occupied cells are hashed the Zobrist way: each cell has a random 64 bits key, and the hash of a set of cells is
+    the XOR of their keys, updated in O(1) when a tile is placed or removed.
+    The table holds at most max_size states, the least recently used ones being evicted first."""
+    def __init__(self, max_size: int = 1_000_000, seed: int = 0):
+        self.max_size = max_size
+        self.random = random.Random(seed)
+        self.cell_keys: Dict[tuple, int] = dict()
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def cell_key(self, position: tuple) -> int:
+        """Zobrist key of a cell, drawn on first use."""
+        key = self.cell_keys.get(position)
+        if key is None:
+            key = self.cell_keys[position] = self.random.getrandbits(64)
+        return key
+
+    def lookup(self, state: tuple) -> [bool, None]:
+        """Returns whether a ring could be closed from the state, or None if it is not in the table."""
+        closes = self.entries.get(state)
+        if closes is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(state)
+        return closes
+
+    def store(self, state: tuple, closes: bool):
+        self.entries[state] = closes
+        self.entries.move_to_end(state)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return dict(size=len(self.entries), hits=self.hits, misses=self.misses, evictions=self.evictions,
+                    hit_rate=self.hits / lookups if lookups else 0.)
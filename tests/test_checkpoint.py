@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+import solver.ring_search
+from resources.data_loader import populate_tantrix_hexagons
+from solver.checkpoint import SearchCheckpoint
+from solver.ring_library import RingLibrary
+from solver.ring_search import RingSearch
+from solver.ring_solver import find_solution
+
+
+class Stop(Exception):
+    pass
+
+
+def _get_ring_types(n_tiles: int) -> list:
+    pieces = populate_tantrix_hexagons()
+    return [p.line_types.get(pieces[n_tiles - 1].back_color) for p in pieces[:n_tiles]]
+
+
+@pytest.mark.parametrize('n_tiles', [9, 11])
+def test_stop_and_resume(tmp_path, monkeypatch, n_tiles):
+    """A search stopped several times, and resumed each time from its last checkpoint, finds the same rings, in the same
+    order, and ends with the same counters as an uninterrupted one."""
+    # check for a checkpoint after every node
+    monkeypatch.setattr(solver.ring_search, 'CHECKPOINT_NODES_MASK', 0)
+    ring_types = _get_ring_types(n_tiles)
+    search = RingSearch(ring_types)
+    rings = list(search.iter_rings())
+    counters = search.get_counters()
+
+    filepath = str(tmp_path / 'checkpoint.json')
+    found = []
+    for stop in [counters['nodes'] // 5, counters['nodes'] // 2, counters['nodes'] * 4 // 5, None]:
+        def stop_search(grid, n_nodes):
+            if stop is not None and n_nodes >= stop:
+                raise Stop
+
+        checkpoint = SearchCheckpoint(filepath, interval=0)
+        search = RingSearch(ring_types, node_callback=stop_search, checkpoint=checkpoint)
+        frontier = checkpoint.load(search)
+        if frontier is not None:
+            # the rings found after the last checkpoint are found again
+            branch = frontier.get_branch()
+            found = [ring for ring in found if list(zip(ring[0][1:], ring[1])) < branch]
+        try:
+            for ring in search.iter_rings(resume=frontier):
+                found.append(ring)
+        except Stop:
+            continue
+    assert found == rings
+    assert search.get_counters() == counters
+
+
+def test_resume_other_tiles(tmp_path):
+    """A checkpoint is only resumed by the puzzle it was saved for, even if another one has the same line types."""
+    pieces = populate_tantrix_hexagons()
+    unsolvable = [pieces[idx] for idx in (0, 1, 2, 3, 8)]
+    solvable = pieces[:5]
+    library = RingLibrary(filepath='')
+    filepath = str(tmp_path / 'checkpoint.json')
+
+    solution, __ = find_solution(unsolvable, 'r', library=library, checkpoint=filepath)
+    assert solution is None
+    with open(filepath) as f:
+        assert json.load(f)['finished']
+    with pytest.raises(ValueError):
+        find_solution(solvable, 'r', library=library, checkpoint=filepath)
+    solution, __ = find_solution(solvable, 'r', library=library, checkpoint=str(tmp_path / 'other.json'))
+    assert solution is not None
@@ -0,0 +1,16 @@
+import pytest
+
+from resources.data_loader import populate_tantrix_hexagons
+from solver.ring_search import RingSearch, equivalent_rings
+
+
+@pytest.mark.parametrize('n_tiles', range(3, 11))
+def test_symmetry_finds_every_ring(n_tiles):
+    """The rings found with symmetry and distance pruning, expanded to all their equivalent rings, are exactly those
+    found without them. Only the expansions starting with a tile of the first type are kept, as a search without
+    symmetry always starts with it."""
+    pieces = populate_tantrix_hexagons()
+    ring_types = [p.line_types.get(pieces[n_tiles - 1].back_color) for p in pieces[:n_tiles]]
+    expanded = {ring for canonical_ring in RingSearch(ring_types).iter_rings()
+                for ring in equivalent_rings(*canonical_ring) if ring[0][0] == ring_types[0]}
+    assert expanded == set(RingSearch(ring_types, symmetry=False, prune_distance=False).iter_rings())
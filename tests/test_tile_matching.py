@@ -0,0 +1,58 @@
+import pytest
+
+from resources.data_loader import populate_tantrix_hexagons
+from solver.hexagrid import POSITION_OFFSET, SparseHexaGrid
+from solver.ring_library import RingLibrary
+from solver.ring_solver import iter_solutions
+from solver.tile_matching import place_solution
+
+
+def _count_solutions(pieces: list, color: str) -> int:
+    """Brute-force number of distinct solutions: the first tile is placed on (0, 0) with its original orientation, which
+    picks one of the rotations of the grid, then the line of the color is followed, trying each other tile with each
+    rotation on the next cell, until all of them are placed and the line closes on the first tile."""
+    first = pieces[0]
+    # otherwise, fixing the orientation of the first tile wouldn't pick a single rotation of the grid
+    assert len(set(first.get_rotated_edge_colors(rotation) for rotation in range(6))) == 6
+    cells = {(0, 0): first.get_rotated_edge_colors(0)}
+    offsets = POSITION_OFFSET.items()
+
+    def count(position: tuple, exit_: int, remaining: list) -> int:
+        offset = POSITION_OFFSET[exit_]
+        position = (position[0] + offset[0], position[1] + offset[1])
+        if not remaining:
+            return int(position == (0, 0))
+        if position in cells:
+            return 0
+        entry = (exit_ + 3) % 6
+        n_solutions = 0
+        for tile in remaining:
+            for rotation in range(6):
+                edge_colors = tile.get_rotated_edge_colors(rotation)
+                if edge_colors[entry] != color:
+                    continue
+                neighbours = [(edge, (position[0] + dx, position[1] + dy)) for edge, (dx, dy) in offsets]
+                if any(cells[cell][(edge + 3) % 6] != edge_colors[edge] for edge, cell in neighbours if cell in cells):
+                    continue
+                cells[position] = edge_colors
+                next_exit = next(edge for edge in range(6) if edge != entry and edge_colors[edge] == color)
+                n_solutions += count(position, next_exit, [other for other in remaining if other is not tile])
+                del cells[position]
+        return n_solutions
+
+    return count((0, 0), cells[(0, 0)].index(color), pieces[1:])
+
+
+@pytest.mark.parametrize('n_tiles', range(3, 8))
+def test_iter_solutions(n_tiles):
+    """iter_solutions finds as many distinct solutions as a brute force, and each of them is a valid placement."""
+    pieces = populate_tantrix_hexagons()[:n_tiles]
+    color = pieces[-1].back_color
+    solutions = [solution for kind, solution in iter_solutions(pieces, color, library=RingLibrary(filepath=''))
+                 if kind == 'solution']
+    assert len(solutions) == _count_solutions(pieces, color)
+    for solution in solutions:
+        grid = SparseHexaGrid()
+        place_solution(solution, grid)
+        valid, mismatches = grid.is_grid_valid()
+        assert valid, mismatches